@@ -4,30 +4,298 @@ Stateless functions that send CGI commands to the camera and parse
 XML responses. Takes config dict with camera credentials.
 """
 
+import functools
+import html
+import http.client
 import logging
+import re
+import socket
+import threading
+import time
 import urllib.parse
-import urllib.request
-import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
 
 log = logging.getLogger("nerdcam")
 
+# Read-only commands whose answers rarely change. Successful responses are
+# cached for CACHE_TTL seconds; any command that is not a get* read clears
+# the cache, since it may change what these return. Live readings such as
+# getDevState, getSystemTime and getWifiConfig (isConnected) are never cached.
+CACHEABLE_CMDS = frozenset({
+    "getPortInfo", "getDevInfo", "getIPInfo", "getImageSetting",
+    "getVideoStreamParam", "getPTZSpeed", "getInfraLedConfig", "getAudioVolume",
+    "getMotionDetectConfig", "getMotionDetectConfig1", "getOSDSetting",
+    "getPCAudioAlarmCfg", "getPTZPresetPointList",
+})
+CACHE_TTL = 30
+
+CGI_PATH = "/cgi-bin/CGIProxy.fcgi"
+
+# One <tag>text</tag> child of <CGI_Result>
+_CGI_FIELD_RE = re.compile(rb"<(\w+)>([^<]*)</\1>")
+
+# The <result> code alone, for callers that need nothing else
+_CGI_RESULT_RE = re.compile(rb"<result>([^<]*)</result>")
+
+# Query keys/values that urlencode would leave unchanged
+_URL_SAFE_RE = re.compile(r"[A-Za-z0-9._-]*")
+
+# Poll delays (seconds) while waiting for a WiFi scan, and the deadline for
+# the whole wait, requests included. The scan usually finishes much sooner.
+_WIFI_SCAN_POLL = (1.0, 0.5, 0.5, 1.0)
+_WIFI_SCAN_WAIT = 4.0
+
+# getWifiList encryption type codes
+WIFI_ENC_NAMES = {"0": "Open", "1": "WEP", "2": "WPA", "3": "WPA2", "4": "WPA/WPA2"}
+
+_cache = {}  # (ip, port, cmd, params) -> (timestamp, raw XML)
+_cache_gen = 0  # bumped by clear_cache(), so in-flight reads don't refill it
+_cache_lock = threading.Lock()
+
+# Per-attempt timeouts for camera reads: a short first try and one longer
+# retry, so an unreachable camera fails in seconds, not 10s.
+CGI_TIMEOUTS = (1.5, 3.0)
+
+# Commands that change the camera (PTZ moves, settings) are not idempotent:
+# a retry could run them twice, so they get one long try on a new connection.
+CGI_WRITE_TIMEOUTS = (10,)
+
+# Idle keep-alive connections to the camera, shared by the CLI, the patrol
+# thread and the proxy's per-request threads. A connection is used by one
+# thread at a time: taken out of the pool, then put back after a request.
+_POOL_SIZE = 4
+_pool = {}  # (host, port) -> list of idle http.client.HTTPConnection
+_pool_lock = threading.Lock()
+
+
+def http_get(host: str, port: int, path: str, timeouts=CGI_TIMEOUTS,
+             idempotent=True) -> bytes:
+    """GET path from the camera over a pooled keep-alive connection.
+
+    Makes one attempt per entry in timeouts; a timeout moves on to the
+    next, so only pass several for requests that are safe to repeat. When
+    a pooled connection turns out to be closed by the camera, the request
+    is sent again on a new one. A reset can also come after the camera got
+    the request, so requests that are not idempotent skip the pool and
+    always get a new connection and a single send.
+    """
+    addr = (host, int(port))
+    conn = None
+    if idempotent:
+        with _pool_lock:
+            idle = _pool.get(addr)
+            conn = idle.pop() if idle else None
+    if conn is None:
+        conn = http.client.HTTPConnection(*addr)
+    attempt = 0
+    while True:
+        timeout = timeouts[attempt]
+        reused = conn.sock is not None
+        conn.timeout = timeout
+        if reused:
+            conn.sock.settimeout(timeout)
+        try:
+            conn.request("GET", path)
+            resp = conn.getresponse()
+            body = resp.read()
+        except socket.timeout:  # not a TimeoutError before 3.10
+            conn.close()
+            attempt += 1
+            if attempt == len(timeouts):
+                raise
+            continue
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            conn.close()
+            if not reused:
+                raise
+            continue  # closed leaves conn.sock None: next try reconnects
+        except Exception:
+            conn.close()
+            raise
+        if resp.will_close:
+            conn.close()
+        else:
+            with _pool_lock:
+                idle = _pool.setdefault(addr, [])
+                if len(idle) < _POOL_SIZE:
+                    idle.append(conn)
+                    conn = None
+            if conn is not None:
+                conn.close()
+        if resp.status != 200:
+            raise http.client.HTTPException(f"HTTP {resp.status} {resp.reason}")
+        return body
+
+
+def clear_cache():
+    """Drop all cached CGI responses."""
+    global _cache_gen
+    with _cache_lock:
+        _cache.clear()
+        _cache_gen += 1
+
+
+@functools.lru_cache(maxsize=4)
+def _auth_query(username: str, password: str) -> str:
+    """Encoded usr/pwd query, built once per set of credentials."""
+    return urllib.parse.urlencode({"usr": username, "pwd": password})
+
+
+def cgi_path(cmd: str, cam: dict, params=None) -> str:
+    """Return the request path for a CGI command, credentials included.
+
+    params is a dict of extra query parameters. It is not taken as keyword
+    arguments, so names like "cmd" or "cam" from a proxied query can't
+    collide with the positional arguments.
+    """
+    query = f"cmd={urllib.parse.quote_plus(cmd)}&{_auth_query(cam['username'], cam['password'])}"
+    if params:
+        # PTZ and settings params are almost always plain numbers or names
+        pairs = [(k, str(v)) for k, v in params.items()]
+        if all(_URL_SAFE_RE.fullmatch(k) and _URL_SAFE_RE.fullmatch(v) for k, v in pairs):
+            query += "&" + "&".join(f"{k}={v}" for k, v in pairs)
+        else:
+            query += "&" + urllib.parse.urlencode(pairs)
+    return f"{CGI_PATH}?{query}"
+
+
+@functools.lru_cache(maxsize=8)
+def _rtsp_url(username: str, password: str, ip: str, port) -> str:
+    return f"rtsp://{username}:{password}@{ip}:{port}/videoMain"
+
+
+def rtsp_url(cam: dict, port=None) -> str:
+    """Return the main-stream RTSP URL, built once per camera and port.
+
+    port defaults to the camera's HTTP port, which the R2 also uses for RTSP.
+    """
+    if port is None:
+        port = cam.get("port", 88)
+    return _rtsp_url(cam["username"], cam["password"], cam["ip"], port)
+
+
+def parse_result(xml_data: bytes) -> dict:
+    """Parse a flat <CGI_Result> response into {tag: text} in one pass.
+
+    Foscam responses are a single level of <tag>text</tag> children, so a
+    precompiled regex reads them without an XML parser. Entities are only
+    decoded in the rare values that contain one.
+    """
+    result = {}
+    for tag, raw in _CGI_FIELD_RE.findall(xml_data):
+        value = raw.decode("utf-8", "replace")
+        if "&" in value:
+            value = html.unescape(value)
+        result[tag.decode()] = value
+    return result
+
+
+def result_code(xml_data: bytes) -> str:
+    """Return the <result> code of a CGI response, "?" if there is none."""
+    m = _CGI_RESULT_RE.search(xml_data)
+    return m.group(1).decode("ascii", "replace").strip() if m else "?"
+
+
+def cgi_raw(cmd: str, cam: dict, params=None) -> bytes:
+    """Send a CGI command and return the raw XML response.
+
+    params is a dict of query parameters, as for cgi_path(). Commands in
+    CACHEABLE_CMDS are answered from the cache while fresh.
+    Commands other than get* reads clear the cache before and after they
+    run, since they may change what those return; a read that overlaps the
+    write is not cached. Writes are not retried after a timeout. Raises on
+    network or HTTP errors.
+    """
+    params = params or {}
+    if not cmd.startswith("get"):
+        clear_cache()
+        try:
+            return http_get(cam["ip"], cam["port"], cgi_path(cmd, cam, params),
+                            timeouts=CGI_WRITE_TIMEOUTS, idempotent=False)
+        finally:
+            clear_cache()  # a timed-out write may still have been applied
+    if cmd not in CACHEABLE_CMDS:
+        return http_get(cam["ip"], cam["port"], cgi_path(cmd, cam, params))
+
+    cache_key = (cam["ip"], cam["port"], cmd, frozenset(params.items()))
+    with _cache_lock:
+        hit = _cache.get(cache_key)
+        gen = _cache_gen
+    if hit and time.monotonic() - hit[0] < CACHE_TTL:
+        return hit[1]
+    xml_data = http_get(cam["ip"], cam["port"], cgi_path(cmd, cam, params))
+    if b"<result>0</result>" in xml_data:
+        with _cache_lock:
+            if gen == _cache_gen:  # no write ran meanwhile
+                _cache[cache_key] = (time.monotonic(), xml_data)
+    return xml_data
+
 
 def cgi(cmd: str, config: dict, **params) -> dict:
     """Send a CGI command and return parsed XML as dict."""
-    cam = config["camera"]
-    base = f"http://{cam['ip']}:{cam['port']}/cgi-bin/CGIProxy.fcgi"
-    params["cmd"] = cmd
-    params["usr"] = cam["username"]
-    params["pwd"] = cam["password"]
-    url = f"{base}?{urllib.parse.urlencode(params)}"
     try:
-        with urllib.request.urlopen(url, timeout=10) as resp:
-            xml_text = resp.read().decode()
+        xml_data = cgi_raw(cmd, config["camera"], params)
     except Exception as e:
         print(f"  ERROR: {e}")
         return {}
-    root = ET.fromstring(xml_text)
-    return {child.tag: (child.text or "") for child in root}
+    return parse_result(xml_data)
+
+
+def cgi_many(cmds, config: dict) -> dict:
+    """Send independent read commands concurrently. Returns {cmd: data}.
+
+    Menus that probe several settings pay one round trip instead of one
+    per command.
+    """
+    cmds = list(cmds)
+    with ThreadPoolExecutor(max_workers=min(4, len(cmds))) as pool:
+        return dict(zip(cmds, pool.map(lambda c: cgi(c, config), cmds)))
+
+
+def poll_cgi(config, cmd, done, delays, wait):
+    """Repeat a read command until done(data) or wait seconds have passed.
+
+    Sleeps per the delays schedule before each try and cuts each request's
+    timeout to the time left, so a camera that stops answering (as it does
+    while switching networks) cannot stretch the wait. Bypasses the cache.
+    Returns the last parsed response, {} if none arrived.
+    """
+    cam = config["camera"]
+    deadline = time.monotonic() + wait
+    data = {}
+    for delay in delays:
+        time.sleep(max(0.0, min(delay, deadline - time.monotonic())))
+        left = deadline - time.monotonic()
+        if left <= 0:
+            break
+        try:
+            xml_data = http_get(cam["ip"], cam["port"], cgi_path(cmd, cam),
+                                timeouts=(min(left, CGI_TIMEOUTS[-1]),))
+        except Exception:
+            continue
+        data = parse_result(xml_data)
+        if done(data):
+            break
+    return data
+
+
+def scan_wifi_list(config: dict) -> dict:
+    """Have the camera scan for WiFi networks and return the new getWifiList
+    answer, {} if the camera did not answer.
+
+    The list from an earlier scan stays readable while the camera scans, so
+    a scan counts as finished once the list differs from the one before it.
+    An unchanged list is returned when the deadline passes.
+    """
+    before = poll_cgi(config, "getWifiList", lambda d: True, (0.0,), CGI_TIMEOUTS[-1])
+    cam = config["camera"]
+    try:
+        cgi_raw("refreshWifiList", cam)
+    except Exception:
+        return {}
+    return poll_cgi(config, "getWifiList",
+                    lambda d: int(d.get("totalCnt", 0) or 0) > 0 and d != before,
+                    _WIFI_SCAN_POLL, _WIFI_SCAN_WAIT)
 
 
 def ok(data: dict, label: str) -> bool:
@@ -44,6 +312,18 @@ def ok(data: dict, label: str) -> bool:
         return False
 
 
+def wifi_aps(data: dict) -> list:
+    """Return the split apN records of a getWifiList response, in order.
+
+    Each record is the unquoted 'ssid+mac+signal+...+encrypt' string split
+    on '+', or an empty list for an empty slot.
+    """
+    count = int(data.get("totalCnt", 0))
+    aps = [raw for tag, raw in data.items() if tag.startswith("ap") and tag[2:].isdigit()]
+    return [urllib.parse.unquote(raw).split("+") if raw else []
+            for raw in aps[:count]]
+
+
 def show_dict(data: dict, skip=("result",)):
     """Pretty-print a CGI response dict."""
     for key, val in data.items():
@@ -6,28 +6,51 @@ via CGI commands. No server or streaming state dependencies.
 
 import datetime
 import getpass
+import http.client
 import os
+import shutil
 import subprocess
 import time
-import urllib.parse
-import urllib.request
 
-from nerdcam.camera_cgi import cgi, ok, show_dict
+from nerdcam.camera_cgi import (WIFI_ENC_NAMES, cgi, cgi_many, cgi_path, ok, poll_cgi,
+                                rtsp_url, scan_wifi_list, show_dict, wifi_aps)
 from nerdcam.state import PROJECT_DIR
 
+# Fields shown by the info screens, in display order
+_DEVINFO_KEYS = ("devName", "productName", "mac", "firmwareVer", "hardwareVer")
+_WIFI_STATUS_KEYS = ("isEnable", "isUseWifi", "isConnected", "connectedAP",
+                     "ssid", "encryptType", "authMode")
+_PORT_KEYS = ("webPort", "httpsPort", "mediaPort", "onvifPort", "rtspPort")
+
+# getInfraLedConfig modes
+_IR_MODE_NAMES = {"0": "auto", "1": "manual (off)"}
+
+# Poll delays (seconds) while waiting for WiFi to connect, and the deadline
+# for the whole wait, requests included. The deadline matches the old fixed
+# sleep; usually the camera reports the connection much sooner.
+_WIFI_CONNECT_POLL = (2.0, 1.0, 1.0)
+_WIFI_CONNECT_WAIT = 5.0
+
+# getVideoStreamParam resolution codes
+_RESOLUTION_NAMES = {"0": "720p", "1": "VGA", "3": "VGA 4:3", "7": "1080p", "9": "1536p"}
+
 
 def _cls():
     os.system("clear" if os.name != "nt" else "cls")
 
 
+def _show_keys(data, keys):
+    """Print the given fields of a CGI response as one block."""
+    print("\n".join(f"  {key}: {data.get(key, '?')}" for key in keys))
+
+
 def show_device_info(config):
     _cls()
     print("--- Device Info ---")
     data = cgi("getDevInfo", config)
     if not ok(data, "getDevInfo"):
         return False
-    for key in ["devName", "productName", "mac", "firmwareVer", "hardwareVer"]:
-        print(f"  {key}: {data.get(key, '?')}")
+    _show_keys(data, _DEVINFO_KEYS)
     return True
 
 
@@ -37,33 +60,26 @@ def show_wifi_status(config):
     data = cgi("getWifiConfig", config)
     if not ok(data, "getWifiConfig"):
         return
-    for key in ["isEnable", "isUseWifi", "isConnected", "connectedAP",
-                 "ssid", "encryptType", "authMode"]:
-        print(f"  {key}: {data.get(key, '?')}")
+    _show_keys(data, _WIFI_STATUS_KEYS)
 
 
 def scan_wifi(config):
     _cls()
     print("--- Scanning WiFi ---")
-    cgi("refreshWifiList", config)
-    print("  Waiting 4 seconds for scan...")
-    time.sleep(4)
-    data = cgi("getWifiList", config)
+    print("  Waiting for scan...")
+    data = scan_wifi_list(config)
     if not ok(data, "getWifiList"):
         return
     count = int(data.get("totalCnt", 0))
     print(f"  Found {count} networks:")
-    enc_map = {"0": "Open", "1": "WEP", "2": "WPA", "3": "WPA2", "4": "WPA/WPA2"}
-    for i in range(count):
-        raw = data.get(f"ap{i}", "")
-        if not raw:
+    for i, parts in enumerate(wifi_aps(data)):
+        if not parts:
             continue
-        parts = urllib.parse.unquote(raw).split("+")
         if len(parts) >= 5:
-            enc = enc_map.get(parts[4], f"type={parts[4]}")
+            enc = WIFI_ENC_NAMES.get(parts[4], f"type={parts[4]}")
             print(f"    {i}: {parts[0]}  signal={parts[2]}%  enc={enc}")
         else:
-            print(f"    {i}: {raw}")
+            print(f"    {i}: {'+'.join(parts)}")
 
 
 def configure_wifi(config):
@@ -96,8 +112,9 @@ def configure_wifi(config):
                     encryptType="4", psk=psk, authMode="2")
         ok(data, "setWifiSettingNew")
 
-    print("  Waiting 5 seconds for WiFi to connect...")
-    time.sleep(5)
+    print("  Waiting for WiFi to connect...")
+    poll_cgi(config, "getWifiConfig", lambda d: d.get("isConnected") == "1",
+          _WIFI_CONNECT_POLL, _WIFI_CONNECT_WAIT)
     show_wifi_status(config)
 
 
@@ -107,8 +124,7 @@ def show_ports(config):
     data = cgi("getPortInfo", config)
     if not ok(data, "getPortInfo"):
         return
-    for key in ["webPort", "httpsPort", "mediaPort", "onvifPort", "rtspPort"]:
-        print(f"  {key}: {data.get(key, '?')}")
+    _show_keys(data, _PORT_KEYS)
 
 
 def reboot_camera(config):
@@ -225,8 +241,7 @@ def ir_menu(config):
     data = cgi("getInfraLedConfig", config)
     if ok(data, "getInfraLedConfig"):
         mode = data.get("mode", "?")
-        mode_names = {"0": "auto", "1": "manual (off)"}
-        print(f"  Current mode: {mode} ({mode_names.get(mode, 'unknown')})")
+        print(f"  Current mode: {mode} ({_IR_MODE_NAMES.get(mode, 'unknown')})")
 
     print("\n  Options:")
     print("  a=auto (IR follows light level)")
@@ -257,13 +272,14 @@ def audio_menu(config):
     _cls()
     print("--- Audio Settings ---")
     print("  Probing audio capabilities...")
-    vol_data = cgi("getAudioVolume", config)
+    probes = cgi_many(["getAudioVolume", "getPCAudioAlarmCfg"], config)
+    vol_data = probes["getAudioVolume"]
     if ok(vol_data, "getAudioVolume"):
         show_dict(vol_data)
     else:
         print("  (getAudioVolume not supported)")
 
-    alarm_data = cgi("getPCAudioAlarmCfg", config)
+    alarm_data = probes["getPCAudioAlarmCfg"]
     if ok(alarm_data, "getPCAudioAlarmCfg"):
         enabled = alarm_data.get("isEnablePCAudioAlarm", "?")
         print(f"  Sound alarm: {'enabled' if enabled == '1' else 'disabled'}")
@@ -334,14 +350,13 @@ def video_settings(config):
         return
 
     # Show main stream (index 0) settings clearly
-    res_names = {"0": "720p", "1": "VGA", "3": "VGA 4:3", "7": "1080p", "9": "1536p"}
     res = data.get("resolution0", "?")
     br = int(data.get("bitRate0", "0"))
     fr = data.get("frameRate0", "?")
     gop = data.get("GOP0", "?")
     vbr = "VBR" if data.get("isVBR0") == "1" else "CBR"
 
-    print(f"  Resolution:  {res_names.get(res, res)}")
+    print(f"  Resolution:  {_RESOLUTION_NAMES.get(res, res)}")
     print(f"  Bitrate:     {br // 1024} kbps ({vbr})")
     print(f"  Framerate:   {fr} fps")
     print(f"  GOP:         {gop} frames (keyframe every {int(gop) / max(int(fr), 1):.1f}s)")
@@ -480,18 +495,23 @@ def take_snapshot(config):
     _cls()
     print("--- Snapshot ---")
     cam = config["camera"]
-    url = (f"http://{cam['ip']}:{cam['port']}/cgi-bin/CGIProxy.fcgi"
-           f"?cmd=snapPicture2&usr={urllib.parse.quote(cam['username'])}"
-           f"&pwd={urllib.parse.quote(cam['password'])}")
+    filename = os.path.join(PROJECT_DIR, f"snapshot_{int(time.time())}.jpg")
+    conn = http.client.HTTPConnection(cam["ip"], int(cam["port"]), timeout=10)
     try:
-        with urllib.request.urlopen(url, timeout=10) as resp:
-            img_data = resp.read()
-        filename = os.path.join(PROJECT_DIR, f"snapshot_{int(time.time())}.jpg")
+        conn.request("GET", cgi_path("snapPicture2", cam))
+        resp = conn.getresponse()
+        if resp.status != 200:
+            raise http.client.HTTPException(f"HTTP {resp.status} {resp.reason}")
+        # Stream straight from the socket to disk instead of buffering the JPEG
         with open(filename, "wb") as f:
-            f.write(img_data)
-        print(f"  Saved: {filename} ({len(img_data)} bytes)")
+            shutil.copyfileobj(resp, f, 64 * 1024)
+        print(f"  Saved: {filename} ({os.path.getsize(filename)} bytes)")
     except Exception as e:
+        if os.path.exists(filename):
+            os.remove(filename)
         print(f"  ERROR: {e}")
+    finally:
+        conn.close()
 
 
 def raw_command(config):
@@ -516,7 +536,7 @@ def show_stream_url(config, server_running):
         print("  WARNING: Server not running! Start it first.\n")
     print("  VIDEO ONLY (lowest latency, ~1s):")
     print("    http://localhost:8088/api/mjpeg")
-    print("    MJPEG — re-encoded from camera H.264, no audio")
+    print("    MJPEG — camera's sub stream if set to MJPEG, else re-encoded H.264; no audio")
     print("    For: NerdPudding, OpenCV, browser (mic off)")
     print()
     print("  SYNCED A/V (~3-3.5s latency):")
@@ -526,6 +546,7 @@ def show_stream_url(config, server_running):
     print()
     print("  SNAPSHOT:")
     print("    http://localhost:8088/api/snap")
+    print("    http://localhost:8088/api/snap?fresh=1  (full resolution, from the camera)")
     print()
     print("  Examples:")
     print("    vlc http://localhost:8088/api/fmp4")
@@ -549,24 +570,48 @@ def watch_stream(config):
     print("  ERROR: neither ffplay nor vlc found. Install ffmpeg or VLC.")
 
 
+_cv2 = None  # OpenCV module once loaded; False if not installed
+
+
+def _load_cv2():
+    """Import OpenCV on first use and remember the result.
+
+    Not imported at module load: cv2 is heavy and only this test uses it.
+    """
+    global _cv2
+    if _cv2 is None:
+        try:
+            import cv2
+            _cv2 = cv2
+        except ImportError:
+            _cv2 = False
+    return _cv2 or None
+
+
 def test_rtsp(config):
     print("\n--- RTSP Test ---")
     cam = config["camera"]
     url = _rtsp_url(config)
     print(f"  RTSP URL: rtsp://{cam['username']}:****@{cam['ip']}:88/videoMain")
-    try:
-        import cv2
-        print("  Attempting OpenCV capture...")
-        cap = cv2.VideoCapture(url)
-        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-        ret, frame = cap.read()
-        if ret:
-            print(f"  SUCCESS: frame {frame.shape[1]}x{frame.shape[0]}")
-        else:
-            print("  FAILED: could not read frame")
-        cap.release()
-    except ImportError:
+    cv2 = _load_cv2()
+    if cv2 is None:
         print("  OpenCV not available.")
+        return
+    print("  Attempting OpenCV capture...")
+    # Force the FFMPEG backend (skips probing every backend) and bound the
+    # open time where this OpenCV version supports it.
+    if hasattr(cv2, "CAP_PROP_OPEN_TIMEOUT_MSEC"):
+        cap = cv2.VideoCapture(url, cv2.CAP_FFMPEG,
+                               [cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, 3000])
+    else:
+        cap = cv2.VideoCapture(url, cv2.CAP_FFMPEG)
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    ret, frame = cap.read()
+    if ret:
+        print(f"  SUCCESS: frame {frame.shape[1]}x{frame.shape[0]}")
+    else:
+        print("  FAILED: could not read frame")
+    cap.release()
 
 
 def update_credentials(config, save_config_fn):
@@ -592,8 +637,6 @@ def update_credentials(config, save_config_fn):
 
 
 def _rtsp_url(config) -> str:
-    cam = config["camera"]
     data = cgi("getPortInfo", config)
     # Fallback to port 88 (Foscam R2 default RTSP port matches HTTP port)
-    rtsp_port = data.get("rtspPort", "88")
-    return f"rtsp://{cam['username']}:{cam['password']}@{cam['ip']}:{rtsp_port}/videoMain"
+    return rtsp_url(config["camera"], data.get("rtspPort", "88"))
@@ -9,13 +9,15 @@ Run: python3 nerdcam.py
 import atexit
 import logging
 import os
+import shutil
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 
 from nerdcam import config as _config_mod
 from nerdcam.state import (AppState, PROJECT_DIR, LOG_PATH,
                            COMPRESSION_LABELS)
 from nerdcam.streaming import MjpegSource
-from nerdcam.recording import Recorder, detect_codecs
+from nerdcam.recording import Recorder, detect_codecs, print_codecs
 from nerdcam.patrol import PatrolController, get_patrol_config, save_patrol_config
 from nerdcam import ptz as _ptz_mod
 from nerdcam import camera_control as _cam_ctl
@@ -106,10 +108,8 @@ def _check_dependencies():
         print("  ffmpeg: NOT FOUND (required for streaming and recording)")
         print("    Install: sudo apt install ffmpeg")
 
-    # xdg-open (nice-to-have for opening browser)
-    try:
-        subprocess.run(["which", "xdg-open"], capture_output=True, timeout=3)
-    except (FileNotFoundError, subprocess.TimeoutExpired):
+    # xdg-open (nice-to-have for opening browser): a PATH lookup, no process
+    if shutil.which("xdg-open") is None:
         print("  xdg-open: not found (browser auto-open disabled)")
 
     if missing:
@@ -124,17 +124,26 @@ def main():
     log.info("=== NerdCam starting ===")
     print(f"  Log file: {LOG_PATH}")
 
+    # Probe recording codecs in the background, overlapping the ffmpeg
+    # check and the master password prompt
+    probe_pool = ThreadPoolExecutor(max_workers=1)
+    codecs_future = probe_pool.submit(detect_codecs)
+    probe_pool.shutdown(wait=False)
+
     _check_dependencies()
 
     # Create centralized state (single source of truth for all settings)
     state = AppState()
     _state = state
-    codecs, default_codec, gpus = detect_codecs()
+
+    config = _config_mod.load_config(state)
+
+    codecs, default_codec, gpus = codecs_future.result()
+    print_codecs(codecs, default_codec, gpus)
     state.rec_codecs = codecs
     state.default_rec_codec = default_codec
     state.available_gpus = gpus
-
-    config = _config_mod.load_config(state)
+    _config_mod.load_settings(state)
 
     # Build server context: all getters/setters read from AppState directly
     _server_ctx = ServerContext(
@@ -553,8 +562,10 @@ def _compression_menu(config):
             ffmpeg_q = int(2 + (10 - val) * 29 / 9)
             print(f"  Set to {val}/10 (internal ffmpeg q={ffmpeg_q})")
             _save_settings()
-            if _server.running:
-                print("  NOTE: Restart the server (stop + start) for changes to take effect.")
+            if _mjpeg.native:
+                print("  No effect right now: /api/mjpeg is the camera's own MJPEG,")
+                print("  whose quality is set on the camera's sub stream.")
+            _mjpeg.set_quality(config["camera"], val, _state.rtsp_transport)
         else:
             print("  Must be 1-10")
     except ValueError:
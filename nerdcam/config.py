@@ -7,12 +7,9 @@ import getpass
 import json
 import os
 import sys
-import time
-import urllib.parse
-import urllib.request
-import xml.etree.ElementTree as ET
 
-from nerdcam.crypto import encrypt_config, decrypt_config
+from nerdcam.camera_cgi import WIFI_ENC_NAMES, scan_wifi_list, wifi_aps
+from nerdcam.crypto import encrypt_config, decrypt_config, upgrade_config
 from nerdcam.state import CONFIG_PATH, CONFIG_PLAIN
 
 
@@ -22,35 +19,22 @@ def _onboarding_scan_wifi(config):
     if not cam.get("ip") or not cam.get("password"):
         print("  (skipped -- need camera IP and password first)")
         return
+    data = scan_wifi_list(config)
+    if not data:
+        print("  (could not reach camera for WiFi scan)")
+        return
     try:
-        base = f"http://{cam['ip']}:{cam['port']}/cgi-bin/CGIProxy.fcgi"
-        params = urllib.parse.urlencode({
-            "cmd": "refreshWifiList", "usr": cam["username"], "pwd": cam["password"]
-        })
-        urllib.request.urlopen(f"{base}?{params}", timeout=5)
-        time.sleep(3)
-        params = urllib.parse.urlencode({
-            "cmd": "getWifiList", "usr": cam["username"], "pwd": cam["password"]
-        })
-        with urllib.request.urlopen(f"{base}?{params}", timeout=5) as resp:
-            root = ET.fromstring(resp.read().decode())
-        data = {child.tag: (child.text or "") for child in root}
-        count = int(data.get("totalCnt", 0))
-        if count > 0:
-            enc_map = {"0": "Open", "1": "WEP", "2": "WPA", "3": "WPA2", "4": "WPA/WPA2"}
-            print(f"  Found {count} networks:")
-            for i in range(count):
-                raw = data.get(f"ap{i}", "")
-                if not raw:
-                    continue
-                parts = urllib.parse.unquote(raw).split("+")
+        aps = wifi_aps(data)
+        if aps:
+            print(f"  Found {len(aps)} networks:")
+            for parts in aps:
                 if len(parts) >= 5:
-                    enc = enc_map.get(parts[4], f"type={parts[4]}")
+                    enc = WIFI_ENC_NAMES.get(parts[4], f"type={parts[4]}")
                     print(f"    {parts[0]}  signal={parts[2]}%  enc={enc}")
         else:
             print("  No networks found.")
-    except Exception:
-        print("  (could not reach camera for WiFi scan)")
+    except ValueError:
+        print("  (could not read WiFi scan result)")
 
 
 def load_settings(state):
@@ -71,21 +55,31 @@ def load_settings(state):
 
 
 def save_settings(state):
-    """Save app settings from AppState into config and encrypt."""
+    """Save app settings from AppState into config and encrypt.
+
+    Skips the save when no setting differs from what is already stored.
+    """
     config = state.config
-    if "settings" not in config:
-        config["settings"] = {}
-    config["settings"]["stream_quality"] = state.stream_quality
-    config["settings"]["mic_gain"] = state.mic_gain
-    config["settings"]["rec_codec"] = state.rec_codec
-    config["settings"]["rec_compression"] = state.rec_compression
-    config["settings"]["rec_gpu"] = state.rec_gpu
-    config["settings"]["rtsp_transport"] = state.rtsp_transport
+    settings = config.setdefault("settings", {})
+    new = {
+        "stream_quality": state.stream_quality,
+        "mic_gain": state.mic_gain,
+        "rec_codec": state.rec_codec,
+        "rec_compression": state.rec_compression,
+        "rec_gpu": state.rec_gpu,
+        "rtsp_transport": state.rtsp_transport,
+    }
+    if all(k in settings and settings[k] == v for k, v in new.items()):
+        return
+    settings.update(new)
     save_config(state)
 
 
 def load_config(state) -> dict:
-    """Load config: try encrypted first, then plaintext, then create new."""
+    """Load config: try encrypted first, then plaintext, then create new.
+
+    Sets state.config; load_settings() then restores the app settings.
+    """
 
     # Try encrypted config
     if os.path.exists(CONFIG_PATH):
@@ -95,8 +89,9 @@ def load_config(state) -> dict:
             config = decrypt_config(state.master_pwd, CONFIG_PATH)
             if config is not None:
                 print("  Config decrypted OK.")
+                if upgrade_config(config, state.master_pwd, CONFIG_PATH):
+                    print("  Config re-encrypted with the current format.")
                 state.config = config
-                load_settings(state)
                 return config
             print("  Wrong master password, try again.")
         print("  Too many failed attempts.")
@@ -8,7 +8,7 @@ import logging
 import threading
 import time
 
-from nerdcam.camera_cgi import cgi
+from nerdcam.camera_cgi import cgi_raw, result_code
 
 log = logging.getLogger("nerdcam")
 
@@ -30,6 +30,7 @@ class PatrolController:
     def __init__(self):
         self._thread = None
         self.running = False
+        self._stop_event = threading.Event()  # set to end the current run
         self._lock = threading.Lock()  # guards start/stop and _status
         self._status = {"running": False, "current_pos": "", "cycle": 0}
 
@@ -48,8 +49,12 @@ class PatrolController:
                 return {"ok": False, "error": "Need at least 2 positions with dwell > 0"}
             self.running = True
             self._status = {"running": True, "current_pos": "", "cycle": 0}
+            # A fresh event per run, so a previous loop still finishing
+            # its camera call cannot pick up this run's stop state
+            self._stop_event = threading.Event()
             self._thread = threading.Thread(
-                target=self._loop, args=(positions, repeat, config), daemon=True)
+                target=self._loop, args=(positions, repeat, config, self._stop_event),
+                daemon=True)
             self._thread.start()
             log.info("Patrol started: %d positions, repeat=%s", len(active), repeat)
             return {"ok": True}
@@ -60,33 +65,41 @@ class PatrolController:
             if not self.running:
                 return {"ok": False, "error": "Patrol not running"}
             self.running = False
+            self._stop_event.set()
             log.info("Patrol stopped")
             return {"ok": True}
 
     def get_status(self):
         """Return current patrol state."""
         with self._lock:
+            dwell_total = self._status.get("dwell_total", 0)
+            dwell_end = self._status.get("dwell_end")  # None while moving
             return {
                 "running": self.running,
                 "current_pos": self._status.get("current_pos", ""),
                 "cycle": self._status.get("cycle", 0),
-                "dwell_total": self._status.get("dwell_total", 0),
-                "dwell_remaining": self._status.get("dwell_remaining", 0),
+                "dwell_total": dwell_total,
+                "dwell_remaining": (max(0, dwell_end - time.monotonic())
+                                    if dwell_end else dwell_total),
             }
 
     def cleanup(self):
         """Safety net: stop patrol thread on exit."""
         self.running = False
+        self._stop_event.set()
 
-    def _loop(self, positions, repeat, config):
-        """Daemon thread: cycle through PTZ positions with dwell times."""
+    def _loop(self, positions, repeat, config, stop):
+        """Daemon thread: cycle through PTZ positions with dwell times.
+
+        Dwells wait on stop, so a stop ends them at once without polling.
+        """
         cycle = 0
-        while self.running:
+        while not stop.is_set():
             cycle += 1
             with self._lock:
                 self._status["cycle"] = cycle
             for pos in positions:
-                if not self.running:
+                if stop.is_set():
                     break
                 name = pos["name"]
                 dwell = pos["dwell"]
@@ -95,23 +108,27 @@ class PatrolController:
                 with self._lock:
                     self._status["current_pos"] = name
                     self._status["dwell_total"] = dwell
-                    self._status["dwell_remaining"] = dwell
-                cgi("ptzGotoPresetPoint", config, name=name)
-                # Sleep in 100ms increments for fast stop response
-                elapsed = 0.0
-                while elapsed < dwell and self.running:
-                    time.sleep(0.1)
-                    elapsed += 0.1
-                    with self._lock:
-                        self._status["dwell_remaining"] = max(0, dwell - elapsed)
+                    self._status["dwell_end"] = None
+                # Only the result code matters here: skip parsing the reply
+                try:
+                    rc = result_code(cgi_raw("ptzGotoPresetPoint", config["camera"], {"name": name}))
+                    if rc != "0":
+                        log.warning("Patrol: goto %s returned result=%s", name, rc)
+                except Exception as e:
+                    log.warning("Patrol: goto %s failed: %s", name, e)
+                with self._lock:
+                    self._status["dwell_end"] = time.monotonic() + dwell
+                stop.wait(dwell)
             if not repeat:
                 break
-        self.running = False
         with self._lock:
+            if self._stop_event is not stop:
+                return  # a new run has started; its state is not ours
+            self.running = False
             self._status["running"] = False
             self._status["current_pos"] = ""
             self._status["dwell_total"] = 0
-            self._status["dwell_remaining"] = 0
+            self._status["dwell_end"] = None
 
 
 def get_patrol_config(config):
@@ -7,6 +7,13 @@ import urllib.parse
 from nerdcam.camera_cgi import cgi, ok
 from nerdcam.patrol import get_patrol_config, save_patrol_config
 
+# Numpad key -> PTZ move command
+_PTZ_CMDS = {
+    "7": "ptzMoveTopLeft", "8": "ptzMoveUp", "9": "ptzMoveTopRight",
+    "4": "ptzMoveLeft",    "5": "ptzReset",  "6": "ptzMoveRight",
+    "1": "ptzMoveBottomLeft", "2": "ptzMoveDown", "3": "ptzMoveBottomRight",
+}
+
 
 def _cls():
     os.system("clear" if os.name != "nt" else "cls")
@@ -32,21 +39,15 @@ def ptz_menu(config, patrol, save_config_fn):
     if status["running"]:
         print(f"  Patrol: RUNNING (pos={status['current_pos']}, cycle={status['cycle']})")
 
-    ptz_cmds = {
-        "7": "ptzMoveTopLeft", "8": "ptzMoveUp", "9": "ptzMoveTopRight",
-        "4": "ptzMoveLeft",    "5": "ptzReset",  "6": "ptzMoveRight",
-        "1": "ptzMoveBottomLeft", "2": "ptzMoveDown", "3": "ptzMoveBottomRight",
-    }
-
     while True:
         choice = input("  PTZ> ").strip().lower()
         if choice == "q":
             break
-        elif choice in ptz_cmds:
+        elif choice in _PTZ_CMDS:
             if patrol.running:
                 patrol.stop()
                 print("  Patrol auto-stopped (manual PTZ)")
-            cgi(ptz_cmds[choice], config)
+            cgi(_PTZ_CMDS[choice], config)
             time.sleep(0.5)
             cgi("ptzStopRun", config)
         elif choice == "s":
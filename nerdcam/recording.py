@@ -5,44 +5,115 @@ of RTSP streams to local MP4 files.
 """
 
 import datetime
+import json
 import logging
 import os
+import shutil
+import signal
 import subprocess
+import threading
 import time
 
 from nerdcam.state import PROJECT_DIR, ALL_REC_CODECS, QUALITY_RANGES
 
 log = logging.getLogger("nerdcam")
 
+# Probe results from the last run, reused while ffmpeg and the NVIDIA
+# setup are unchanged
+CODECS_CACHE_PATH = os.path.join(PROJECT_DIR, "codecs_cache.json")
 
-def detect_codecs():
-    """Probe ffmpeg for available encoders and GPUs. Called once at startup.
 
-    Returns (codecs_dict, default_codec, gpus_list).
-    """
-    available = set()
+def _start_probe(cmd):
+    """Start a probe command with captured stdout. None if not installed."""
     try:
-        out = subprocess.run(["ffmpeg", "-encoders"],
-                             capture_output=True, text=True, timeout=5)
-        for line in out.stdout.splitlines():
-            parts = line.split()
-            if len(parts) >= 2:
-                available.add(parts[1])
-    except (FileNotFoundError, subprocess.TimeoutExpired):
-        pass
+        return subprocess.Popen(cmd, stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL, text=True)
+    except FileNotFoundError:
+        return None
+
+
+def _probe_output(proc, deadline) -> str:
+    """Return a probe's stdout, or "" if it is missing or misses deadline."""
+    if proc is None:
+        return ""
+    try:
+        return proc.communicate(timeout=max(0, deadline - time.monotonic()))[0]
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.communicate()
+        return ""
+
+
+def _probe_fingerprint() -> list:
+    """Identify the installed ffmpeg, nvidia-smi and GPUs without running them."""
+    fingerprint = []
+    for tool in ("ffmpeg", "nvidia-smi"):
+        path = shutil.which(tool)
+        if path:
+            st = os.stat(path)
+            fingerprint.append([path, st.st_mtime_ns, st.st_size])
+        else:
+            fingerprint.append(None)
+    try:
+        fingerprint.append(sorted(os.listdir("/proc/driver/nvidia/gpus")))
+    except OSError:
+        fingerprint.append(None)
+    return fingerprint
+
+
+def _probe_encoders_and_gpus():
+    """Run ffmpeg -encoders and nvidia-smi. Returns (encoder set, gpus list)."""
+    # Both probes run at once, sharing one 5 s deadline
+    deadline = time.monotonic() + 5
+    encoders_proc = _start_probe(["ffmpeg", "-encoders"])
+    gpus_proc = _start_probe(
+        ["nvidia-smi", "--query-gpu=index,name", "--format=csv,noheader"])
+
+    available = set()
+    for line in _probe_output(encoders_proc, deadline).splitlines():
+        parts = line.split()
+        if len(parts) >= 2:
+            available.add(parts[1])
 
     # Detect NVIDIA GPUs
     gpus = []
+    for line in _probe_output(gpus_proc, deadline).strip().splitlines():
+        parts = [p.strip() for p in line.split(",", 1)]
+        if len(parts) == 2:
+            gpus.append((parts[0], parts[1]))
+    return available, gpus
+
+
+def detect_codecs():
+    """Probe ffmpeg for available encoders and GPUs. Called once at startup.
+
+    Prints nothing, so it can run in the background during the password
+    prompt; print_codecs() shows the result.
+
+    The result is cached in CODECS_CACHE_PATH; later runs skip the probes
+    while the ffmpeg and nvidia-smi binaries and the GPU list are unchanged.
+
+    Returns (codecs_dict, default_codec, gpus_list).
+    """
+    fingerprint = _probe_fingerprint()
     try:
-        out = subprocess.run(
-            ["nvidia-smi", "--query-gpu=index,name", "--format=csv,noheader"],
-            capture_output=True, text=True, timeout=5)
-        for line in out.stdout.strip().splitlines():
-            parts = [p.strip() for p in line.split(",", 1)]
-            if len(parts) == 2:
-                gpus.append((parts[0], parts[1]))
-    except (FileNotFoundError, subprocess.TimeoutExpired):
-        pass
+        with open(CODECS_CACHE_PATH) as f:
+            cache = json.load(f)
+        if cache["fingerprint"] != fingerprint:
+            raise ValueError("stale")
+        available = set(cache["encoders"])
+        gpus = [tuple(g) for g in cache["gpus"]]
+    except (OSError, ValueError, KeyError, TypeError):
+        available, gpus = _probe_encoders_and_gpus()
+        if available:  # don't cache a failed or timed-out probe
+            required = {r for _, _, _, r in ALL_REC_CODECS if r}
+            try:
+                with open(CODECS_CACHE_PATH, "w") as f:
+                    json.dump({"fingerprint": fingerprint,
+                               "encoders": sorted(available & required),
+                               "gpus": gpus}, f)
+            except OSError:
+                pass
 
     codecs = {}
     for key, encoder, desc, required in ALL_REC_CODECS:
@@ -59,7 +130,11 @@ def detect_codecs():
         codecs["original"] = (None, "Original (no re-encode)")
         default_codec = "original"
 
-    # Print summary
+    return codecs, default_codec, gpus
+
+
+def print_codecs(codecs, default_codec, gpus):
+    """Print a one-line summary of the detect_codecs() result."""
     gpu_count = sum(1 for k in codecs if k.startswith("nvenc_"))
     sw_count = sum(1 for k in codecs if k.startswith("sw_"))
     info = []
@@ -74,8 +149,6 @@ def detect_codecs():
         info.append("passthrough")
     print(f"  Recording codecs: {', '.join(info)} (default: {default_codec})")
 
-    return codecs, default_codec, gpus
-
 
 def build_video_args(rec_codec, rec_compression, rec_gpu, rec_codecs, available_gpus):
     """Build ffmpeg video args from codec + compression level."""
@@ -91,7 +164,8 @@ def build_video_args(rec_codec, rec_compression, rec_gpu, rec_codecs, available_
         args = ["-c:v", encoder]
         if rec_gpu != "auto" and len(available_gpus) > 1:
             args += ["-gpu", rec_gpu]
-        args += ["-cq", str(qval), "-preset", "p4"]
+        # -b:v 0 lifts NVENC's default 2M target, so -cq alone sets quality
+        args += ["-rc", "vbr", "-cq", str(qval), "-b:v", "0", "-preset", "p4"]
         return args
     else:
         return ["-c:v", encoder, "-crf", str(qval), "-preset", "fast"]
@@ -105,10 +179,18 @@ class Recorder:
         self._info = None  # {"filename": str, "started": float, ...}
         self._max_seconds = max_seconds
         self.output_dir = output_dir or os.path.join(PROJECT_DIR, "recordings")
+        # Serializes start/stop: the CLI and viewer threads may both call them
+        self._lock = threading.Lock()
 
     def start(self, rtsp_url, rtsp_transport, rec_codec, rec_compression,
               rec_gpu, rec_codecs, available_gpus):
         """Start recording. Returns True on success."""
+        with self._lock:
+            return self._start(rtsp_url, rtsp_transport, rec_codec, rec_compression,
+                               rec_gpu, rec_codecs, available_gpus)
+
+    def _start(self, rtsp_url, rtsp_transport, rec_codec, rec_compression,
+               rec_gpu, rec_codecs, available_gpus):
         if self._proc and self._proc.poll() is None:
             log.warning("Recording start called but already recording")
             return False
@@ -121,6 +203,10 @@ class Recorder:
                                       rec_codecs, available_gpus)
         try:
             cmd = ["ffmpeg", "-y",
+                   # Stopped by SIGINT, so no stdin; stderr is only read if
+                   # ffmpeg exits at once, so keep it quiet enough that the
+                   # pipe never fills during a long recording
+                   "-nostdin", "-nostats", "-loglevel", "error",
                    "-rtsp_transport", rtsp_transport,
                    "-i", rtsp_url,
                    *video_args,
@@ -129,7 +215,7 @@ class Recorder:
                    filepath]
             self._proc = subprocess.Popen(
                 cmd,
-                stdin=subprocess.PIPE,
+                stdin=subprocess.DEVNULL,
                 stdout=subprocess.DEVNULL,
                 stderr=subprocess.PIPE
             )
@@ -153,7 +239,12 @@ class Recorder:
             return False
 
     def stop(self):
-        """Stop recording by sending 'q' to ffmpeg for clean MP4 finalization."""
+        """Stop recording with SIGINT, which ffmpeg handles like 'q': it
+        finalizes the MP4 before exiting."""
+        with self._lock:
+            return self._stop()
+
+    def _stop(self):
         if not self._proc or self._proc.poll() is not None:
             self._proc = None
             self._info = None
@@ -161,8 +252,7 @@ class Recorder:
             return False
 
         try:
-            self._proc.stdin.write(b"q")
-            self._proc.stdin.flush()
+            self._proc.send_signal(signal.SIGINT)
             self._proc.wait(timeout=10)
         except Exception:
             self._proc.kill()
@@ -173,12 +263,16 @@ class Recorder:
         return True
 
     def status(self):
-        """Return current recording state as dict."""
-        if self._proc and self._proc.poll() is None and self._info:
-            elapsed = time.time() - self._info["started"]
+        """Return current recording state as dict.
+
+        Reads without the lock, so it never waits out a start in progress.
+        """
+        proc, info = self._proc, self._info
+        if proc and proc.poll() is None and info:
+            elapsed = time.time() - info["started"]
             return {
                 "recording": True,
-                "filename": self._info["filename"],
+                "filename": info["filename"],
                 "elapsed": int(elapsed)
             }
         return {"recording": False, "filename": "", "elapsed": 0}
@@ -187,8 +281,7 @@ class Recorder:
         """Safety net: kill orphaned ffmpeg recording process."""
         if self._proc and self._proc.poll() is None:
             try:
-                self._proc.stdin.write(b"q")
-                self._proc.stdin.flush()
+                self._proc.send_signal(signal.SIGINT)
                 self._proc.wait(timeout=5)
             except Exception:
                 try:
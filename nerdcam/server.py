@@ -8,18 +8,26 @@ import http.server
 import json
 import logging
 import os
-import subprocess
+import queue
+import selectors
 import threading
-import time
-import urllib.parse
-import urllib.request
-import xml.etree.ElementTree as ET
+import zlib
 from urllib.parse import urlparse, parse_qs
 
-from nerdcam.state import PROJECT_DIR
+from nerdcam.camera_cgi import cgi_path, cgi_raw, http_get, result_code
+from nerdcam.state import MJPEG_STALE_SECONDS, PROJECT_DIR
+from nerdcam.streaming import AudioSource, Fmp4Source
 
 log = logging.getLogger("nerdcam")
 
+# Static part of each MJPEG multipart frame header; only the length varies
+_MJPEG_PART_PREFIX = b"--ffmpeg\r\nContent-Type: image/jpeg\r\nContent-Length: "
+
+# /api/snap serves the shared MJPEG frame when it is at most this old (s).
+# That frame is re-encoded or sub-stream sized; /api/snap?fresh=1 always
+# asks the camera for a full-resolution snapshot.
+SNAP_MAX_AGE = 1.0
+
 
 class NerdCamServer:
     """Manages the HTTP server lifecycle."""
@@ -27,8 +35,8 @@ class NerdCamServer:
     def __init__(self):
         self._server = None
         self.shutting_down = False
-        self._active_procs = []  # track per-client ffmpeg processes
-        self._procs_lock = threading.Lock()  # guards _active_procs
+        self.fmp4 = Fmp4Source()  # shared fMP4 source for /api/fmp4
+        self.audio = AudioSource()  # shared MP3 source for /api/audio
 
     @property
     def running(self):
@@ -47,9 +55,8 @@ class NerdCamServer:
 
         self.shutting_down = False
         cam = config["camera"]
-        cam_base = f"http://{cam['ip']}:{cam['port']}/cgi-bin/CGIProxy.fcgi"
 
-        handler = _make_handler(cam, cam_base, mjpeg, ctx, self)
+        handler = _make_handler(cam, mjpeg, ctx, self)
 
         self._server = _ThreadedServer(("127.0.0.1", port), handler)
         thread = threading.Thread(target=self._server.serve_forever, daemon=True)
@@ -61,15 +68,8 @@ class NerdCamServer:
         """Stop the server, MJPEG source, and all active stream processes."""
         self.shutting_down = True
         mjpeg.stop()
-        # Kill all active per-client ffmpeg processes
-        with self._procs_lock:
-            procs_snapshot = list(self._active_procs)
-            self._active_procs.clear()
-        for proc in procs_snapshot:
-            try:
-                proc.kill()
-            except Exception:
-                pass
+        self.fmp4.stop()
+        self.audio.stop()
         if self._server:
             self._server.shutdown()
             self._server = None
@@ -79,19 +79,6 @@ class NerdCamServer:
         print("  No server running.")
         return False
 
-    def register_proc(self, proc):
-        """Track a per-client ffmpeg process for cleanup on stop."""
-        with self._procs_lock:
-            self._active_procs.append(proc)
-
-    def unregister_proc(self, proc):
-        """Remove a finished per-client ffmpeg process."""
-        with self._procs_lock:
-            try:
-                self._active_procs.remove(proc)
-            except ValueError:
-                pass
-
 
 class ServerContext:
     """Bundles all callbacks and state accessors the server handler needs.
@@ -136,20 +123,106 @@ class ServerContext:
         self.start_mjpeg = start_mjpeg
 
 
+_VIEWER_TEMPLATE = os.path.join(PROJECT_DIR, "nerdcam_template.html")
+_viewer_cache = None  # (mtime_ns, size, etag, body) of the loaded template
+
+
+def _viewer_page():
+    """Return (etag, body) of the viewer page.
+
+    The template is read again only when its mtime or size changes, so
+    edits still show up on reload.
+    """
+    global _viewer_cache
+    st = os.stat(_VIEWER_TEMPLATE)
+    cached = _viewer_cache
+    if cached is None or cached[:2] != (st.st_mtime_ns, st.st_size):
+        with open(_VIEWER_TEMPLATE, "rb") as f:
+            body = f.read()
+        etag = f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+        cached = _viewer_cache = (st.st_mtime_ns, st.st_size, etag, body)
+    return cached[2], cached[3]
+
+
 class _ThreadedServer(http.server.ThreadingHTTPServer):
     daemon_threads = True
+    # Listen backlog (default 5): a viewer page opens several streams and
+    # API calls at once, and extra clients may connect at the same moment
+    request_queue_size = 64
 
 
-def _make_handler(cam, cam_base, mjpeg, ctx, server_instance):
+def _make_handler(cam, mjpeg, ctx, server_instance):
     """Create a request handler class with access to server context."""
 
+    def set_rtsp_transport(val):
+        ctx.set_rtsp_transport(val)
+        ctx.stop_mjpeg()
+        log.info("RTSP transport changed to %s, MJPEG source will restart on next request", val)
+
+    # /api/settings query keys: (name, parse, valid, apply). Values that
+    # fail to parse or validate are ignored.
+    settings_spec = (
+        ("mic_gain", float, lambda v: 1.0 <= v <= 5.0,
+         lambda v: ctx.set_mic_gain(round(v, 1))),
+        ("rec_codec", str, lambda v: v in ctx.get_rec_codecs(), ctx.set_rec_codec),
+        ("rec_compression", int, lambda v: 1 <= v <= 10, ctx.set_rec_compression),
+        ("rec_gpu", str,
+         lambda v: v == "auto" or any(idx == v for idx, _ in ctx.get_available_gpus()),
+         ctx.set_rec_gpu),
+        ("rtsp_transport", str, lambda v: v in ("udp", "tcp"), set_rtsp_transport),
+    )
+
     class ProxyHandler(http.server.SimpleHTTPRequestHandler):
+        # Buffer responses so the header block and a small body go out in
+        # one send. Streaming handlers flush after each piece they write.
+        wbufsize = 64 * 1024
+        # Each flush is a complete frame/response: send it without Nagle delay
+        disable_nagle_algorithm = True
+        # Keep-alive: the viewer's API calls reuse one connection instead of
+        # a new TCP handshake each. Every non-streaming response carries a
+        # Content-Length; streams send "Connection: close". Idle kept-alive
+        # connections are closed after this many seconds.
+        protocol_version = "HTTP/1.1"
+        timeout = 60
+
+        # Path -> handler method name; each handler takes the parsed URL.
+        # The viewer page (server-side rendered, no file on disk) has
+        # several aliases; anything else falls through to static files.
+        _ROUTES = {
+            "/api/cam": "_handle_cam",  # camera CGI proxy
+            "/api/snap": "_handle_snap",
+            "/api/mjpeg": "_handle_mjpeg",
+            "/api/audio": "_handle_audio",
+            "/api/settings": "_handle_settings",
+            "/api/record": "_handle_record",
+            "/api/patrol": "_handle_patrol",
+            "/api/fmp4": "_handle_fmp4",
+            "/nerdcam": "_handle_viewer",
+            "/nerdcam.html": "_handle_viewer",
+            "/": "_handle_viewer",
+            "/index.html": "_handle_viewer",
+        }
+
         def __init__(self, *args, **kwargs):
             super().__init__(*args, directory=PROJECT_DIR, **kwargs)
 
         def log_message(self, format, *args):
             pass
 
+        # A client that disconnects mid-stream leaves bytes in the write
+        # buffer; the final flushes then fail on the closed socket.
+        def handle(self):
+            try:
+                super().handle()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def finish(self):
+            try:
+                super().finish()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
         def do_HEAD(self):
             """Handle HEAD requests for health checks and browser probes."""
             parsed = urlparse(self.path)
@@ -165,6 +238,7 @@ def _make_handler(cam, cam_base, mjpeg, ctx, server_instance):
             body = json.dumps(data).encode()
             self.send_response(status)
             self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
             self.send_header("Access-Control-Allow-Origin", "*")
             self.end_headers()
             self.wfile.write(body)
@@ -175,75 +249,34 @@ def _make_handler(cam, cam_base, mjpeg, ctx, server_instance):
 
         def do_GET(self):
             parsed = urlparse(self.path)
-
-            # Proxy: /api/cam?cmd=XXX&param=val -> camera CGI
-            if parsed.path == "/api/cam":
-                self._handle_cam(parsed)
-                return
-
-            if parsed.path == "/api/snap":
-                self._handle_snap()
-                return
-
-            if parsed.path == "/api/mjpeg":
-                self._handle_mjpeg()
-                return
-
-            if parsed.path == "/api/audio":
-                self._handle_audio()
-                return
-
-            if parsed.path == "/api/settings":
-                self._handle_settings(parsed)
-                return
-
-            if parsed.path == "/api/record":
-                self._handle_record(parsed)
-                return
-
-            if parsed.path == "/api/patrol":
-                self._handle_patrol(parsed)
-                return
-
-            if parsed.path == "/api/fmp4":
-                self._handle_fmp4()
-                return
-
-            # Serve viewer page from template (server-side rendered, no file on disk)
-            if parsed.path in ("/nerdcam", "/nerdcam.html", "/", "/index.html"):
-                self._handle_viewer()
+            handler = self._ROUTES.get(parsed.path)
+            if handler is not None:
+                getattr(self, handler)(parsed)
                 return
-
             # Default: serve static files
             super().do_GET()
 
         def _handle_cam(self, parsed):
             qs = parse_qs(parsed.query)
             params = {k: v[0] for k, v in qs.items()}
-            params["usr"] = cam["username"]
-            params["pwd"] = cam["password"]
-            cam_url = f"{cam_base}?{urllib.parse.urlencode(params)}"
-            cmd_name = params.get("cmd", "?")
-            extra_params = {k: v for k, v in params.items() if k not in ("cmd", "usr", "pwd")}
-            if extra_params:
-                log.debug("CGI: %s %s", cmd_name, extra_params)
+            cmd_name = params.pop("cmd", "?")
+            params.pop("usr", None)
+            params.pop("pwd", None)
+            if params:
+                log.debug("CGI: %s %s", cmd_name, params)
             else:
                 log.debug("CGI: %s", cmd_name)
             try:
-                with urllib.request.urlopen(cam_url, timeout=10) as resp:
-                    data = resp.read()
-                try:
-                    _root = ET.fromstring(data.decode())
-                    _result = {c.tag: c.text or "" for c in _root}
-                    _rc = _result.get("result", "?")
-                    if _rc != "0":
-                        log.warning("CGI: %s returned result=%s", cmd_name, _rc)
-                    elif cmd_name.startswith("ptz"):
-                        log.info("CGI: %s OK %s", cmd_name, extra_params)
-                except Exception:
-                    pass
+                # Cached reads; any other command invalidates the cache
+                data = cgi_raw(cmd_name, cam, params)
+                rc = result_code(data)
+                if rc != "0":
+                    log.warning("CGI: %s returned result=%s", cmd_name, rc)
+                elif cmd_name.startswith("ptz"):
+                    log.info("CGI: %s OK %s", cmd_name, params)
                 self.send_response(200)
                 self.send_header("Content-Type", "text/xml")
+                self.send_header("Content-Length", str(len(data)))
                 self.send_header("Access-Control-Allow-Origin", "*")
                 self.end_headers()
                 self.wfile.write(data)
@@ -251,151 +284,131 @@ def _make_handler(cam, cam_base, mjpeg, ctx, server_instance):
                 log.error("CGI proxy error (cmd=%s): %s", cmd_name, e)
                 self._error_json(502, f"Camera error: {e}")
 
-        def _handle_snap(self):
-            snap_url = (f"{cam_base}?cmd=snapPicture2"
-                        f"&usr={urllib.parse.quote(cam['username'])}"
-                        f"&pwd={urllib.parse.quote(cam['password'])}")
-            try:
-                with urllib.request.urlopen(snap_url, timeout=10) as resp:
-                    data = resp.read()
-                self.send_response(200)
-                self.send_header("Content-Type", "image/jpeg")
-                self.send_header("Cache-Control", "no-cache")
+        def _handle_snap(self, parsed):
+            # A live viewer already decodes the stream: hand out its latest
+            # frame instead of asking the camera to encode another JPEG.
+            fresh = parse_qs(parsed.query).get("fresh", ["0"])[0] not in ("", "0")
+            data = None if fresh else mjpeg.latest(SNAP_MAX_AGE)
+            if data is None:
+                try:
+                    data = http_get(cam["ip"], cam["port"],
+                                    cgi_path("snapPicture2", cam), timeouts=(10,))
+                except Exception:
+                    self._error_json(502, "Snapshot failed")
+                    return
+            etag = f'"{zlib.crc32(data):08x}-{len(data)}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
                 self.end_headers()
-                self.wfile.write(data)
-            except Exception:
-                self._error_json(502, "Snapshot failed")
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "image/jpeg")
+            self.send_header("Content-Length", str(len(data)))
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(data)
 
-        def _handle_mjpeg(self):
+        def _handle_mjpeg(self, parsed):
             self.connection.settimeout(30)
             ctx.start_mjpeg(cam)
             self.send_response(200)
             self.send_header("Content-Type",
                              "multipart/x-mixed-replace; boundary=ffmpeg")
+            self.send_header("Connection", "close")  # body runs until close
             self.send_header("Cache-Control", "no-cache")
             self.end_headers()
             log.info("MJPEG client connected from %s", self.client_address[0])
+            last_id = 0
+            dropped = 0
+            # epoll/kqueue where available: select() fails on fds >= 1024
+            writable = selectors.DefaultSelector()
+            writable.register(self.connection, selectors.EVENT_WRITE)
             try:
-                last_id = 0
-                no_frame_count = 0
                 while not server_instance.shutting_down:
-                    fid = mjpeg.frame_id
-                    frame = mjpeg.frame
-                    if fid > last_id and frame is not None:
-                        no_frame_count = 0
-                        last_id = fid
-                        self.wfile.write(b"--ffmpeg\r\n")
-                        self.wfile.write(b"Content-Type: image/jpeg\r\n")
-                        self.wfile.write(
-                            f"Content-Length: {len(frame)}\r\n".encode())
-                        self.wfile.write(b"\r\n")
-                        self.wfile.write(frame)
-                        self.wfile.write(b"\r\n")
-                        self.wfile.flush()
-                    else:
-                        time.sleep(0.02)
-                        no_frame_count += 1
-                        if no_frame_count >= 100:
-                            if server_instance.shutting_down:
-                                break
-                            log.warning("MJPEG client: %ds no frames, requesting source restart",
-                                        no_frame_count // 50)
+                    # Sleeps until the reader publishes a frame, instead of
+                    # every viewer thread polling
+                    fid, frame = mjpeg.wait_frame(last_id, MJPEG_STALE_SECONDS)
+                    if frame is None:
+                        if not server_instance.shutting_down:
+                            log.warning("MJPEG client: no frames, requesting source restart")
                             ctx.start_mjpeg(cam)
-                            no_frame_count = 0
+                        continue
+                    if last_id:
+                        dropped += fid - last_id - 1  # published while we were writing
+                    last_id = fid
+                    # Client still has earlier frames queued: skip this one
+                    # rather than let the delay build up in the send buffer
+                    if not writable.select(0):
+                        dropped += 1
+                        continue
+                    # One write (one send syscall) per frame
+                    self.wfile.write(b"".join((
+                        _MJPEG_PART_PREFIX, b"%d\r\n\r\n" % len(frame),
+                        frame, b"\r\n")))
+                    self.wfile.flush()
             except (BrokenPipeError, ConnectionResetError, OSError):
-                log.info("MJPEG client disconnected from %s", self.client_address[0])
+                log.info("MJPEG client disconnected from %s (%d frames dropped)",
+                         self.client_address[0], dropped)
+            finally:
+                writable.close()
 
-        def _handle_audio(self):
+        def _handle_audio(self, parsed):
             self.connection.settimeout(30)
-            rtsp_port = cam.get("port", 88)
-            rtsp_url = (f"rtsp://{cam['username']}:{cam['password']}"
-                        f"@{cam['ip']}:{rtsp_port}/videoMain")
             self.send_response(200)
             self.send_header("Content-Type", "audio/mpeg")
+            self.send_header("Connection", "close")  # body runs until close
             self.send_header("Cache-Control", "no-cache")
             self.end_headers()
+            self.wfile.flush()
             transport = ctx.get_rtsp_transport()
             gain = ctx.get_mic_gain()
-            probe = "500000" if transport == "tcp" else "32768"
-            analyze = "500000" if transport == "tcp" else "0"
-            log.info("Audio stream starting (transport=%s, gain=%.1f)", transport, gain)
-            proc = None
+            log.info("Audio client connected (transport=%s, gain=%.1f, client=%s)",
+                     transport, gain, self.client_address[0])
+            audio = server_instance.audio
+            q = audio.subscribe(cam, transport, gain)
             try:
-                proc = subprocess.Popen(
-                    ["ffmpeg",
-                     "-fflags", "+nobuffer+flush_packets",
-                     "-flags", "low_delay",
-                     "-probesize", probe,
-                     "-analyzeduration", analyze,
-                     "-rtsp_transport", transport,
-                     "-i", rtsp_url,
-                     "-vn",
-                     "-af", f"volume={gain}",
-                     "-c:a", "libmp3lame",
-                     "-b:a", "128k",
-                     "-f", "mp3",
-                     "-flush_packets", "1",
-                     "pipe:1"],
-                    stdin=subprocess.DEVNULL,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.DEVNULL
-                )
-                server_instance.register_proc(proc)
+                idle = 0
                 while not server_instance.shutting_down:
-                    chunk = proc.stdout.read(4096)
-                    if not chunk:
-                        break
-                    self.wfile.write(chunk)
+                    try:
+                        data = q.get(timeout=1)
+                    except queue.Empty:
+                        idle += 1
+                        if idle >= 10:
+                            log.warning("Audio client: 10s no data, closing")
+                            break
+                        continue
+                    # MP3 frames are a few hundred bytes: send everything
+                    # already queued behind this one with a single flush
+                    while data is not None:
+                        self.wfile.write(data)
+                        try:
+                            data = q.get_nowait()
+                        except queue.Empty:
+                            break
                     self.wfile.flush()
+                    if data is None:
+                        break
+                    idle = 0
             except (BrokenPipeError, ConnectionResetError, OSError):
                 log.info("Audio stream disconnected")
             except Exception as e:
                 log.error("Audio stream error: %s", e)
             finally:
-                if proc:
-                    server_instance.unregister_proc(proc)
-                    try:
-                        proc.kill()
-                    except Exception:
-                        pass
+                audio.unsubscribe(q)
 
         def _handle_settings(self, parsed):
             qs = parse_qs(parsed.query)
             changed = False
-            if "mic_gain" in qs:
-                try:
-                    val = float(qs["mic_gain"][0])
-                    if 1.0 <= val <= 5.0:
-                        ctx.set_mic_gain(round(val, 1))
-                        changed = True
-                except (ValueError, IndexError):
-                    pass
-            if "rec_codec" in qs:
-                val = qs["rec_codec"][0]
-                if val in ctx.get_rec_codecs():
-                    ctx.set_rec_codec(val)
-                    changed = True
-            if "rec_compression" in qs:
+            for name, parse, valid, apply in settings_spec:
                 try:
-                    val = int(qs["rec_compression"][0])
-                    if 1 <= val <= 10:
-                        ctx.set_rec_compression(val)
-                        changed = True
-                except (ValueError, IndexError):
-                    pass
-            if "rec_gpu" in qs:
-                val = qs["rec_gpu"][0]
-                valid = {"auto"} | {idx for idx, _ in ctx.get_available_gpus()}
-                if val in valid:
-                    ctx.set_rec_gpu(val)
+                    val = parse(qs[name][0])
+                except (KeyError, IndexError, ValueError):
+                    continue
+                if valid(val):
+                    apply(val)
                     changed = True
-            if "rtsp_transport" in qs:
-                val = qs["rtsp_transport"][0]
-                if val in ("udp", "tcp"):
-                    ctx.set_rtsp_transport(val)
-                    changed = True
-                    ctx.stop_mjpeg()
-                    log.info("RTSP transport changed to %s, MJPEG source will restart on next request", val)
             if changed:
                 ctx.save_settings()
             codecs_info = {k: {"desc": v[1]}
@@ -438,13 +451,12 @@ def _make_handler(cam, cam_base, mjpeg, ctx, server_instance):
                         pass
                 if "repeat" in qs:
                     patrol_data["repeat"] = qs["repeat"][0] == "true"
-                if patrol_data:
-                    current = ctx.get_patrol_config()
-                    current.update(patrol_data)
-                    ctx.save_patrol_config(current)
                 result = ctx.get_patrol_config()
+                if patrol_data:
+                    result.update(patrol_data)
+                    ctx.save_patrol_config(result)
             else:
-                result = ctx.get_patrol_status()
+                result = None  # status only
             result_with_status = dict(ctx.get_patrol_status())
             if isinstance(result, dict) and "ok" in result:
                 result_with_status.update(result)
@@ -452,79 +464,66 @@ def _make_handler(cam, cam_base, mjpeg, ctx, server_instance):
                 result_with_status["config"] = result
             self._json_response(result_with_status)
 
-        def _handle_fmp4(self):
+        def _handle_fmp4(self, parsed):
             self.connection.settimeout(30)
-            rtsp_port = cam.get("port", 88)
-            rtsp_url = (f"rtsp://{cam['username']}:{cam['password']}"
-                        f"@{cam['ip']}:{rtsp_port}/videoMain")
             self.send_response(200)
             self.send_header("Content-Type", "video/mp4")
+            self.send_header("Connection", "close")  # body runs until close
             self.send_header("Cache-Control", "no-cache")
             self.send_header("Access-Control-Allow-Origin", "*")
             self.end_headers()
             transport = ctx.get_rtsp_transport()
             gain = ctx.get_mic_gain()
-            probe = "500000" if transport == "tcp" else "32768"
-            analyze = "500000" if transport == "tcp" else "0"
-            gain_filter = f"volume={gain:.1f}" if gain != 1.0 else "volume=1.0"
-            log.info("fMP4 stream starting (transport=%s, gain=%.1f, client=%s)",
+            log.info("fMP4 client connected (transport=%s, gain=%.1f, client=%s)",
                      transport, gain, self.client_address[0])
-            proc = None
+            fmp4 = server_instance.fmp4
+            q = fmp4.subscribe(cam, transport, gain)
             try:
-                proc = subprocess.Popen(
-                    ["ffmpeg",
-                     "-fflags", "+nobuffer+flush_packets+genpts",
-                     "-flags", "low_delay",
-                     "-probesize", probe,
-                     "-analyzeduration", analyze,
-                     "-rtsp_transport", transport,
-                     "-i", rtsp_url,
-                     "-c:v", "copy",
-                     "-c:a", "aac", "-b:a", "128k",
-                     "-af", gain_filter,
-                     "-f", "mp4",
-                     "-movflags", "frag_keyframe+empty_moov+default_base_moof",
-                     "-frag_duration", "500000",
-                     "-min_frag_duration", "250000",
-                     "-flush_packets", "1",
-                     "pipe:1"],
-                    stdin=subprocess.DEVNULL,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE
-                )
-                server_instance.register_proc(proc)
+                init = fmp4.wait_init(10)
+                if init is None:
+                    log.warning("fMP4 source produced no init segment")
+                    return
+                self.wfile.write(init)  # goes out together with the headers
+                self.wfile.flush()
+                idle = 0
                 while not server_instance.shutting_down:
-                    chunk = proc.stdout.read(4096)
-                    if not chunk:
+                    try:
+                        data = q.get(timeout=1)
+                    except queue.Empty:
+                        idle += 1
+                        if idle >= 10:
+                            log.warning("fMP4 client: 10s no data, closing")
+                            break
+                        continue
+                    if data is None:
                         break
-                    self.wfile.write(chunk)
+                    idle = 0
+                    self.wfile.write(data)
                     self.wfile.flush()
             except (BrokenPipeError, ConnectionResetError, OSError):
                 log.info("fMP4 stream disconnected")
             except Exception as e:
                 log.error("fMP4 stream error: %s", e)
             finally:
-                if proc:
-                    server_instance.unregister_proc(proc)
-                    try:
-                        proc.kill()
-                    except Exception:
-                        pass
+                fmp4.unsubscribe(q)
 
-        def _handle_viewer(self):
+        def _handle_viewer(self, parsed):
             """Serve the web viewer from template (no credentials in HTML)."""
-            template = os.path.join(PROJECT_DIR, "nerdcam_template.html")
             try:
-                with open(template, encoding="utf-8") as f:
-                    html = f.read()
+                etag, body = _viewer_page()
             except FileNotFoundError:
                 self._error_json(404, "Viewer template not found")
                 return
-            body = html.encode("utf-8")
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
             self.send_response(200)
             self.send_header("Content-Type", "text/html; charset=utf-8")
             self.send_header("Cache-Control", "no-cache")
             self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etag)
             self.end_headers()
             self.wfile.write(body)
 
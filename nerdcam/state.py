@@ -20,6 +20,10 @@ CONFIG_PLAIN = os.path.join(PROJECT_DIR, "config.json")
 # Constant: force-restart MJPEG if no frame for this long
 MJPEG_STALE_SECONDS = 2
 
+# RTSP socket I/O timeout for live ffmpeg pipelines (microseconds), so a dead
+# camera ends ffmpeg in seconds instead of hanging on the default
+RTSP_TIMEOUT_US = 5_000_000
+
 # Codec definitions: (key, encoder_name, description, required_ffmpeg_encoder)
 # encoder_name=None means -c:v copy (no re-encode, compression level ignored)
 ALL_REC_CODECS = [
@@ -1,20 +1,155 @@
-"""Shared MJPEG source for NerdCam.
+"""Shared stream sources for NerdCam.
 
-One ffmpeg process reads the camera RTSP stream and decodes to MJPEG.
-Multiple browser clients poll the latest frame from the shared buffer.
-Uses simple polling — CPython's GIL makes single variable reads/writes
-atomic, and there's only one writer thread.
+MjpegSource: one ffmpeg process reads the camera RTSP stream and decodes
+to MJPEG, or the camera's own MJPEG stream is read directly when it offers
+one. Multiple browser clients wait on a condition for the next frame in
+the shared buffer; the single reader thread notifies them.
+
+Fmp4Source: one ffmpeg process remuxes the stream to fragmented MP4,
+fanned out to per-client queues. AudioSource does the same for the MP3
+audio stream.
 """
 
+import abc
+import functools
+import http.client
 import logging
+import os
+import queue
+import re
+import socket
+import struct
 import subprocess
 import threading
 import time
+import urllib.parse
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
-from nerdcam.state import MJPEG_STALE_SECONDS
+from nerdcam.camera_cgi import rtsp_url
+from nerdcam.state import MJPEG_STALE_SECONDS, RTSP_TIMEOUT_US
 
 log = logging.getLogger("nerdcam")
 
+# Pipe buffer for ffmpeg output, and the MJPEG read size: large enough that
+# a whole JPEG or keyframe fragment fits instead of 64 KiB pieces.
+_PIPE_SIZE = 1 << 20
+
+# Largest JPEG the MJPEG reader buffers while waiting for its end marker;
+# beyond this the stream is corrupt and the partial frame is dropped.
+_MAX_FRAME = 4 << 20
+
+
+def _grow_pipe(fd):
+    """Enlarge a pipe's kernel buffer to _PIPE_SIZE where Linux allows it.
+
+    Done with fcntl rather than Popen(pipesize=...), which needs 3.10.
+    """
+    if fcntl is not None and hasattr(fcntl, "F_SETPIPE_SZ"):
+        try:
+            fcntl.fcntl(fd, fcntl.F_SETPIPE_SZ, _PIPE_SIZE)
+        except OSError:
+            pass  # above /proc/sys/fs/pipe-max-size; keep the default
+
+
+def _parse_ffmpeg_major(version_text):
+    """Major version from `ffmpeg -version` output, None for git/date builds."""
+    m = re.match(r"ffmpeg version n?(\d+)\.", version_text)
+    return int(m.group(1)) if m else None
+
+
+@functools.lru_cache(maxsize=None)
+def _ffmpeg_major():
+    """Major version of the ffmpeg on PATH, probed once per run."""
+    try:
+        out = subprocess.run(["ffmpeg", "-version"], stdout=subprocess.PIPE,
+                             stderr=subprocess.DEVNULL, timeout=5).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return _parse_ffmpeg_major(out.decode("utf-8", "replace"))
+
+
+def rtsp_timeout_args(major=None):
+    """ffmpeg input options that bound RTSP socket I/O.
+
+    ffmpeg 5 renamed -stimeout to -timeout. On 4.x, -timeout instead makes
+    the RTSP demuxer listen for an incoming connection, so the option must
+    follow the installed version. Unknown versions (git builds) are new.
+    """
+    if major is None:
+        major = _ffmpeg_major()
+    flag = "-stimeout" if major is not None and major < 5 else "-timeout"
+    return [flag, str(RTSP_TIMEOUT_US)]
+
+
+class _CameraMjpegStream:
+    """The camera's native MJPEG stream (CGIStream.cgi?cmd=GetMJStream).
+
+    Foscam HD cameras only serve it while the sub stream is set to MJPEG.
+    Quacks like the ffmpeg Popen for MjpegSource: poll(), kill(), wait(), pid.
+    """
+
+    PATH = "/cgi-bin/CGIStream.cgi"
+
+    def __init__(self, conn, sock, resp):
+        self.pid = None
+        self.returncode = None
+        self._conn = conn
+        self._sock = sock
+        self._resp = resp
+
+    @classmethod
+    def open(cls, cam):
+        """Return a stream if the camera answers with multipart MJPEG, else None.
+
+        Raises OSError or HTTPException when the camera could not be asked,
+        so the caller can tell "no MJPEG" from "try again later".
+        """
+        query = urllib.parse.urlencode({"cmd": "GetMJStream", "usr": cam["username"],
+                                        "pwd": cam["password"]})
+        conn = http.client.HTTPConnection(cam["ip"], int(cam.get("port", 88)), timeout=3)
+        try:
+            conn.request("GET", f"{cls.PATH}?{query}")
+            sock = conn.sock  # the response takes it over for an unbounded body
+            resp = conn.getresponse()
+            if resp.status == 200 and resp.getheader("Content-Type", "").startswith("multipart/"):
+                sock.settimeout(MJPEG_STALE_SECONDS * 5)
+                return cls(conn, sock, resp)
+        except BaseException:
+            conn.close()
+            raise
+        conn.close()
+        return None
+
+    def read(self):
+        """Next chunk of the multipart body, b"" once the stream ended."""
+        try:
+            chunk = self._resp.read1(65536)
+        except (OSError, ValueError, http.client.HTTPException):
+            chunk = b""
+        if not chunk:
+            if self.returncode is None:
+                self.returncode = 0
+            self._resp.close()
+            self._conn.close()
+        return chunk
+
+    def poll(self):
+        return self.returncode
+
+    def kill(self):
+        self.returncode = -9
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)  # wakes the reader blocked in recv
+        except OSError:
+            pass
+
+    def wait(self, timeout=None):
+        return self.returncode
+
 
 class MjpegSource:
     """Shared MJPEG source: one ffmpeg process, multiple browser clients."""
@@ -22,12 +157,40 @@ class MjpegSource:
     def __init__(self):
         self.frame = None          # latest JPEG frame bytes
         self.frame_id = 0          # incremented on each new frame
-        self._proc = None          # ffmpeg subprocess
+        self._proc = None          # ffmpeg subprocess or _CameraMjpegStream
         self._quality = None       # quality level when source was started
         self._last_frame_time = 0  # time.time() of last frame
+        self._native = None        # camera serves MJPEG itself (None: not probed)
+        self._new_frame = threading.Condition()  # notified on frame/stop
+        self._stops = 0            # incremented by stop(), wakes waiting clients
+        self._start_lock = threading.Lock()
 
     def start(self, cam, stream_quality, rtsp_transport):
-        """Start shared ffmpeg MJPEG source if not already running."""
+        """Start shared ffmpeg MJPEG source if not already running.
+
+        Serialized, since every waiting viewer asks for a restart at once
+        after a stop.
+        """
+        with self._start_lock:
+            self._start(cam, stream_quality, rtsp_transport)
+
+    @property
+    def native(self):
+        """True while the camera's own MJPEG stream is being served."""
+        return isinstance(self._proc, _CameraMjpegStream)
+
+    def set_quality(self, cam, stream_quality, rtsp_transport):
+        """Restart a running ffmpeg source with a new quality.
+
+        Connected viewers stay connected and carry on with the new frames
+        after a short pause. Does nothing when the source is stopped or the
+        camera's own MJPEG stream is used.
+        """
+        with self._start_lock:
+            if self._proc is not None and not self.native and self._quality != stream_quality:
+                self._start(cam, stream_quality, rtsp_transport)
+
+    def _start(self, cam, stream_quality, rtsp_transport):
         if self._proc:
             if self._proc.poll() is None:
                 # Process alive — but is it actually producing frames?
@@ -35,22 +198,41 @@ class MjpegSource:
                 if self._quality == stream_quality and frame_age < MJPEG_STALE_SECONDS:
                     return  # alive and producing frames, nothing to do
                 # Stale or quality changed — kill and restart
-                log.warning("MJPEG source stale (%.1fs no frames), restarting ffmpeg", frame_age)
+                if self._quality != stream_quality:
+                    log.info("MJPEG quality %s -> %d, restarting ffmpeg",
+                             self._quality, stream_quality)
+                else:
+                    log.warning("MJPEG source stale (%.1fs no frames), restarting ffmpeg", frame_age)
                 self.stop()
-                time.sleep(0.5)
             else:
                 log.info("MJPEG ffmpeg process died (exit=%s), restarting", self._proc.returncode)
                 try:
-                    self._proc.kill()
+                    self._proc.wait(timeout=2)  # already exited: just reap it
                 except Exception:
                     pass
                 self._proc = None
-                time.sleep(0.5)
 
-        rtsp_port = cam.get("port", 88)
-        rtsp_url = (f"rtsp://{cam['username']}:{cam['password']}"
-                    f"@{cam['ip']}:{rtsp_port}/videoMain")
         self._quality = stream_quality
+        if self._native is not False:
+            # The camera's own MJPEG needs no decode/encode here. Settled by
+            # the camera's first answer; an unreachable camera is asked again
+            # on the next start.
+            try:
+                stream = _CameraMjpegStream.open(cam)
+            except (OSError, http.client.HTTPException) as e:
+                log.warning("Camera MJPEG probe failed (%s), using ffmpeg for now", e)
+                stream = None
+            else:
+                self._native = stream is not None
+            if stream is not None:
+                log.info("Using camera MJPEG stream (%s:%s)", cam["ip"], cam.get("port", 88))
+                self._proc = stream
+                self._last_frame_time = time.time()
+                threading.Thread(target=self._reader, args=(stream, stream.read),
+                                 daemon=True).start()
+                return
+
+        rtsp_port = cam.get("port", 88)
         # TCP needs larger probesize to find video track in interleaved data.
         probe = "500000" if rtsp_transport == "tcp" else "32768"
         analyze = "500000" if rtsp_transport == "tcp" else "0"
@@ -58,18 +240,24 @@ class MjpegSource:
                  stream_quality, rtsp_transport, cam['ip'], rtsp_port)
         proc = subprocess.Popen(
             ["ffmpeg",
-             "-fflags", "+nobuffer+flush_packets",
+             "-nostats", "-loglevel", "error",  # stderr is only read at exit
+             "-fflags", "+nobuffer+discardcorrupt+flush_packets",
              "-flags", "low_delay",
              "-probesize", probe,
              "-analyzeduration", analyze,
+             "-max_delay", "0",
+             "-reorder_queue_size", "0",
+             "-use_wallclock_as_timestamps", "1",
              "-rtsp_transport", rtsp_transport,
-             "-i", rtsp_url,
+             *rtsp_timeout_args(),
+             "-i", rtsp_url(cam),
              "-f", "mjpeg",
              "-q:v", str(int(2 + (10 - stream_quality) * 29 / 9)),
              "-r", "25",
              "-an",
              "-threads", "1",
              "-flush_packets", "1",
+             "-avioflags", "direct",  # one write per JPEG, not 32 KiB pieces
              "pipe:1"],
             stdin=subprocess.DEVNULL,
             stdout=subprocess.PIPE,
@@ -78,7 +266,19 @@ class MjpegSource:
         self._proc = proc
         self._last_frame_time = time.time()
 
-        threading.Thread(target=self._reader, args=(proc,), daemon=True).start()
+        fd = proc.stdout.fileno()
+        _grow_pipe(fd)
+        read = functools.partial(os.read, fd, _PIPE_SIZE)
+        threading.Thread(target=self._reader, args=(proc, read), daemon=True).start()
+
+    def latest(self, max_age):
+        """Return the current frame if the source is running and produced
+        it within max_age seconds, else None."""
+        frame = self.frame
+        if (self._proc is None or frame is None
+                or time.time() - self._last_frame_time > max_age):
+            return None
+        return frame
 
     def stop(self):
         """Stop the shared MJPEG source."""
@@ -86,30 +286,80 @@ class MjpegSource:
             log.info("Stopping MJPEG source (pid=%s)", self._proc.pid)
             try:
                 self._proc.kill()
+                # Reap it: returns as soon as it has exited, so a restart
+                # needs no fixed delay and no zombie is left behind
+                self._proc.wait(timeout=2)
             except Exception:
                 pass
             self._proc = None
-        self.frame = None
+        with self._new_frame:
+            self.frame = None
+            self._stops += 1
+            self._new_frame.notify_all()
 
-    def _reader(self, proc):
-        """Read JPEG frames from ffmpeg stdout into shared buffer."""
-        buf = b""
+    def wait_frame(self, last_id, timeout):
+        """Block until a frame newer than last_id arrives, the source stops,
+        or timeout passes. Returns (frame_id, frame); frame is None if no
+        newer frame is available."""
+        with self._new_frame:
+            stops = self._stops
+            self._new_frame.wait_for(
+                lambda: self.frame_id > last_id or self._stops != stops, timeout)
+            if self.frame_id > last_id and self.frame is not None:
+                return self.frame_id, self.frame
+            return last_id, None
+
+    def _reader(self, proc, read):
+        """Read JPEG frames from read() into shared buffer until it returns b"".
+
+        Each byte is scanned once: 'scan' marks where the previous search
+        stopped, and 'start' remembers the SOI of a partly received frame.
+        The scans are bytes.find (memchr in C); a read holding exactly one
+        frame, the usual case with ffmpeg, is published without copying.
+        """
+        buf = bytearray()
+        scan = 0
+        start = -1
         frame_count = 0
         try:
             while True:
-                chunk = proc.stdout.read(4096)
+                chunk = read()
                 if not chunk:
                     break
-                buf += chunk
-                while True:
-                    start = buf.find(b"\xff\xd8")
-                    end = buf.find(b"\xff\xd9", start + 2) if start >= 0 else -1
-                    if start < 0 or end < 0:
-                        break
-                    jpeg = buf[start:end + 2]
-                    buf = buf[end + 2:]
-                    self.frame = jpeg
-                    self.frame_id += 1
+                if (not buf and chunk.startswith(b"\xff\xd8")
+                        and chunk.find(b"\xff\xd9", 2) == len(chunk) - 2):
+                    frames = (chunk,)
+                else:
+                    buf += chunk
+                    frames = []
+                    while True:
+                        if start < 0:
+                            start = buf.find(b"\xff\xd8", scan)
+                            if start < 0:
+                                # No frame start yet: keep only a possible split marker
+                                del buf[:-1]
+                                scan = 0
+                                break
+                        end = buf.find(b"\xff\xd9", max(start + 2, scan))
+                        if end < 0:
+                            if len(buf) - start > _MAX_FRAME:
+                                log.warning("MJPEG: no end marker in %d bytes, dropping frame",
+                                            len(buf) - start)
+                                del buf[:-1]
+                                scan = 0
+                                start = -1
+                                break
+                            scan = max(start + 2, len(buf) - 1)
+                            break
+                        frames.append(bytes(buf[start:end + 2]))
+                        del buf[:end + 2]
+                        scan = 0
+                        start = -1
+                for jpeg in frames:
+                    with self._new_frame:
+                        self.frame = jpeg
+                        self.frame_id += 1
+                        self._new_frame.notify_all()
                     self._last_frame_time = time.time()
                     frame_count += 1
                     if frame_count == 1:
@@ -117,7 +367,7 @@ class MjpegSource:
         except Exception as e:
             log.error("MJPEG reader exception: %s", e)
         log.info("MJPEG reader stopped after %d frames", frame_count)
-        if proc.poll() and proc.stderr:
+        if proc.poll() and getattr(proc, "stderr", None):
             try:
                 err = proc.stderr.read().decode(errors="replace").strip()
                 if err:
@@ -125,3 +375,268 @@ class MjpegSource:
                     log.warning("MJPEG ffmpeg stderr:\n  %s", "\n  ".join(lines))
             except Exception:
                 pass
+
+
+class _FanoutSource(abc.ABC):
+    """One ffmpeg process shared by many clients through per-client queues.
+
+    Subclasses start the process in _start_locked() and run a reader
+    thread that hands each chunk to _publish(). A client whose queue is
+    full is disconnected rather than skipped ahead: a gap in the fMP4
+    fragments or the MP3 byte stream breaks the player, while the viewer
+    reconnects and starts clean from the init segment.
+    """
+
+    NAME = "shared"
+    QUEUE_ITEMS = 8  # per-client backlog
+
+    def __init__(self):
+        self._proc = None
+        self._params = None        # (cam ip, transport, gain) of running proc
+        self._subscribers = set()  # one queue.Queue per connected client
+        self._lock = threading.Lock()  # guards everything above
+
+    def subscribe(self, cam, rtsp_transport, mic_gain):
+        """Register a client, starting ffmpeg if needed. Returns its queue.
+
+        Settings changes only take effect when no other client is watching,
+        so a new viewer never cuts off an existing one.
+        """
+        q = queue.Queue(self.QUEUE_ITEMS)
+        params = (cam["ip"], rtsp_transport, mic_gain)
+        with self._lock:
+            alive = self._proc is not None and self._proc.poll() is None
+            if not alive or (params != self._params and not self._subscribers):
+                self._stop_locked()  # ends clients of a dead process
+                self._start_locked(cam, rtsp_transport, mic_gain)
+                self._params = params
+            self._subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        """Remove a client. Stops ffmpeg when the last client leaves."""
+        with self._lock:
+            self._subscribers.discard(q)
+            if not self._subscribers:
+                self._stop_locked()
+
+    def stop(self):
+        """Stop ffmpeg and end all client streams."""
+        with self._lock:
+            self._stop_locked()
+
+    @abc.abstractmethod
+    def _start_locked(self, cam, rtsp_transport, mic_gain):
+        """Start ffmpeg and its reader thread. Called with _lock held."""
+
+    def _stop_locked(self):
+        if self._proc:
+            log.info("Stopping %s source (pid=%s)", self.NAME, self._proc.pid)
+            try:
+                self._proc.kill()
+                self._proc.wait(timeout=2)  # reap it, no zombie left behind
+            except Exception:
+                pass
+            self._proc = None
+        for q in self._subscribers:
+            self._end(q)
+        self._subscribers.clear()
+
+    def _publish(self, proc, data):
+        """Hand data to every client. False once proc is no longer current."""
+        with self._lock:
+            if self._proc is not proc:
+                return False
+            lagging = [q for q in self._subscribers if not self._offer(q, data)]
+            for q in lagging:
+                log.warning("%s client fell behind, disconnecting it", self.NAME)
+                self._subscribers.discard(q)
+                self._end(q)
+        return True
+
+    def _reader_done(self, proc):
+        """Clean up after proc's reader ends, unless it was replaced."""
+        with self._lock:
+            if self._proc is proc:
+                self._stop_locked()
+
+    @staticmethod
+    def _offer(q, item):
+        """Queue item for a client. False if its queue is full."""
+        try:
+            q.put_nowait(item)
+        except queue.Full:
+            return False
+        return True
+
+    @staticmethod
+    def _end(q):
+        """End a client's stream: drop its backlog, queue the end marker."""
+        try:
+            while True:
+                q.get_nowait()
+        except queue.Empty:
+            pass
+        q.put_nowait(None)  # only _lock holders put, so there is room
+
+
+class Fmp4Source(_FanoutSource):
+    """Shared fMP4 A/V source: one ffmpeg process, fanned out to clients.
+
+    The reader splits ffmpeg's output into MP4 boxes. ftyp + moov form the
+    init segment, and each moof + mdat pair is one fragment. A client that
+    joins mid-stream gets the init segment and then live fragments; the
+    player discards frames up to the next keyframe on its own.
+    """
+
+    NAME = "fMP4"
+    QUEUE_ITEMS = 8  # per-client backlog (~4s of 500ms fragments)
+
+    def __init__(self):
+        super().__init__()
+        self._init = None          # init segment bytes, once received
+        self._init_ready = threading.Event()
+
+    def wait_init(self, timeout):
+        """Return the init segment, waiting up to timeout. None if not ready."""
+        self._init_ready.wait(timeout)
+        return self._init
+
+    def _start_locked(self, cam, rtsp_transport, mic_gain):
+        probe = "500000" if rtsp_transport == "tcp" else "32768"
+        analyze = "500000" if rtsp_transport == "tcp" else "0"
+        gain_filter = f"volume={mic_gain:.1f}" if mic_gain != 1.0 else "volume=1.0"
+        log.info("Starting fMP4 source (transport=%s, gain=%.1f)", rtsp_transport, mic_gain)
+        self._init = None
+        self._init_ready = threading.Event()
+        self._proc = subprocess.Popen(
+            ["ffmpeg",
+             "-fflags", "+nobuffer+flush_packets+genpts",
+             "-flags", "low_delay",
+             "-probesize", probe,
+             "-analyzeduration", analyze,
+             "-max_delay", "0",
+             "-reorder_queue_size", "0",
+             "-rtsp_transport", rtsp_transport,
+             *rtsp_timeout_args(),
+             "-i", rtsp_url(cam),
+             "-c:v", "copy",
+             "-c:a", "aac", "-b:a", "128k",
+             "-af", gain_filter,
+             "-f", "mp4",
+             "-movflags", "frag_keyframe+empty_moov+default_base_moof",
+             "-frag_duration", "500000",
+             "-min_frag_duration", "250000",
+             "-flush_packets", "1",
+             "pipe:1"],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL
+        )
+        # Keyframe fragments often exceed the default 64 KiB pipe buffer
+        _grow_pipe(self._proc.stdout.fileno())
+        threading.Thread(target=self._reader, args=(self._proc, self._init_ready),
+                         daemon=True).start()
+
+    def _stop_locked(self):
+        super()._stop_locked()
+        self._init_ready.set()  # release anyone still waiting for init
+
+    def _reader(self, proc, init_ready):
+        """Split ffmpeg output into init segment and fragments, fan out."""
+        read = proc.stdout.read
+        init = []
+        fragment = []
+        count = 0
+        try:
+            while True:
+                header = read(8)
+                if len(header) < 8:
+                    break
+                size, box_type = struct.unpack(">I4s", header)
+                if size == 1:  # 64-bit box size follows the type
+                    ext = read(8)
+                    header += ext
+                    size = struct.unpack(">Q", ext)[0]
+                if size < len(header):
+                    # 0 ("to end of file") or too small: the stream is
+                    # corrupt, and read() of a negative length would block
+                    log.warning("fMP4: bad %r box size %d, restarting", box_type, size)
+                    break
+                body = read(size - len(header))
+                if len(body) < size - len(header):
+                    break
+                box = header + body
+                if box_type in (b"ftyp", b"moov"):
+                    init.append(box)
+                    if box_type == b"moov":
+                        with self._lock:
+                            if self._proc is not proc:
+                                break
+                            self._init = b"".join(init)
+                        init_ready.set()
+                    continue
+                fragment.append(box)
+                if box_type == b"mdat":
+                    data = b"".join(fragment)
+                    fragment = []
+                    count += 1
+                    if not self._publish(proc, data):
+                        break
+        except Exception as e:
+            log.error("fMP4 reader exception: %s", e)
+        log.info("fMP4 reader stopped after %d fragments", count)
+        self._reader_done(proc)
+
+
+class AudioSource(_FanoutSource):
+    """Shared MP3 audio source for /api/audio: one ffmpeg process, fanned
+    out to clients.
+
+    MP3 needs no init segment, and ffmpeg writes one frame per packet, so
+    a client can join at any chunk.
+    """
+
+    NAME = "audio"
+    QUEUE_ITEMS = 64  # per-client backlog (~1.5s of 26ms MP3 frames)
+
+    def _start_locked(self, cam, rtsp_transport, mic_gain):
+        probe = "500000" if rtsp_transport == "tcp" else "32768"
+        analyze = "500000" if rtsp_transport == "tcp" else "0"
+        log.info("Starting audio source (transport=%s, gain=%.1f)", rtsp_transport, mic_gain)
+        self._proc = subprocess.Popen(
+            ["ffmpeg",
+             "-fflags", "+nobuffer+flush_packets",
+             "-flags", "low_delay",
+             "-probesize", probe,
+             "-analyzeduration", analyze,
+             "-max_delay", "0",
+             "-reorder_queue_size", "0",
+             "-rtsp_transport", rtsp_transport,
+             *rtsp_timeout_args(),
+             "-i", rtsp_url(cam),
+             "-vn",
+             "-af", f"volume={mic_gain}",
+             "-c:a", "libmp3lame",
+             "-b:a", "128k",
+             "-f", "mp3",
+             "-flush_packets", "1",
+             "pipe:1"],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL
+        )
+        threading.Thread(target=self._reader, args=(self._proc,), daemon=True).start()
+
+    def _reader(self, proc):
+        """Fan out ffmpeg's MP3 output as it arrives."""
+        fd = proc.stdout.fileno()
+        try:
+            while True:
+                chunk = os.read(fd, 65536)
+                if not chunk or not self._publish(proc, chunk):
+                    break
+        except Exception as e:
+            log.error("Audio reader exception: %s", e)
+        log.info("Audio reader stopped")
+        self._reader_done(proc)
@@ -0,0 +1,52 @@
+import base64
+import json
+import os
+import tempfile
+import unittest
+
+from nerdcam import crypto
+
+CONFIG = {"camera": {"ip": "192.0.2.10", "port": 88, "username": "u", "password": "p"}}
+MASTER = "correct horse"
+
+
+def _write_nc2(path, config, master):
+    """Write config in the old XOR/PBKDF2-SHA512 format."""
+    salt = os.urandom(16)
+    key = crypto._derive_key(master, salt)
+    plaintext = json.dumps(config).encode()
+    payload = base64.b64encode(salt + crypto._xor_bytes(plaintext, key)).decode()
+    with open(path, "w") as f:
+        f.write(crypto._FORMAT_V2 + payload)
+
+
+class UpgradeConfigTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "config.enc")
+        crypto._session_key = None
+        crypto._last_written = None
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _prefix(self):
+        with open(self.path) as f:
+            return f.read(4)
+
+    def test_rewrites_old_format(self):
+        current = crypto._FORMAT_V3 if crypto.AESGCM is not None else crypto._FORMAT_V4
+        # Same config already saved this session, then the file goes old-format
+        crypto.encrypt_config(CONFIG, MASTER, self.path)
+        _write_nc2(self.path, CONFIG, MASTER)
+        self.assertEqual(crypto.decrypt_config(MASTER, self.path), CONFIG)
+
+        self.assertTrue(crypto.upgrade_config(CONFIG, MASTER, self.path))
+        self.assertEqual(self._prefix(), current)
+        self.assertEqual(crypto.decrypt_config(MASTER, self.path), CONFIG)
+        self.assertFalse(crypto.upgrade_config(CONFIG, MASTER, self.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
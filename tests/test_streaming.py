@@ -0,0 +1,43 @@
+import unittest
+from unittest import mock
+
+from nerdcam import streaming
+from nerdcam.state import RTSP_TIMEOUT_US
+
+CAM = {"ip": "192.0.2.10", "port": 88, "username": "u", "password": "p"}
+
+
+class RtspTimeoutArgsTest(unittest.TestCase):
+
+    def test_parse_version(self):
+        parse = streaming._parse_ffmpeg_major
+        self.assertEqual(parse("ffmpeg version 4.4.2-0ubuntu0.22.04.1 Copyright"), 4)
+        self.assertEqual(parse("ffmpeg version n5.1.2 Copyright"), 5)
+        self.assertEqual(parse("ffmpeg version 6.0-static https://"), 6)
+        self.assertIsNone(parse("ffmpeg version N-109876-g1234abcd Copyright"))
+
+    def test_option_per_version(self):
+        us = str(RTSP_TIMEOUT_US)
+        self.assertEqual(streaming.rtsp_timeout_args(4), ["-stimeout", us])
+        self.assertEqual(streaming.rtsp_timeout_args(5), ["-timeout", us])
+        self.assertEqual(streaming.rtsp_timeout_args(7), ["-timeout", us])
+
+    def test_pipeline_argv(self):
+        for major, flag in ((4, "-stimeout"), (5, "-timeout"), (None, "-timeout")):
+            for source in (streaming.Fmp4Source(), streaming.AudioSource()):
+                with mock.patch.object(streaming, "_ffmpeg_major", return_value=major), \
+                        mock.patch.object(streaming.subprocess, "Popen") as popen, \
+                        mock.patch.object(streaming, "_grow_pipe"), \
+                        mock.patch.object(streaming.threading, "Thread"):
+                    source._start_locked(CAM, "tcp", 1.0)
+                argv = popen.call_args[0][0]
+                with self.subTest(source=source.NAME, major=major):
+                    i = argv.index(flag)
+                    self.assertEqual(argv[i + 1], str(RTSP_TIMEOUT_US))
+                    self.assertLess(i, argv.index("-i"))
+                    other = "-timeout" if flag == "-stimeout" else "-stimeout"
+                    self.assertNotIn(other, argv)
+
+
+if __name__ == "__main__":
+    unittest.main()